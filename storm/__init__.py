@@ -1,4 +1,6 @@
 from .database import StormDB  # noqa: F401
+from .async_database import AsyncStormDB  # noqa: F401
 from .client import StormClient, StormUserClient  # noqa: F401
+from .async_client import AsyncStormClient  # noqa: F401
 from .objects import StormConfig, Playlist, Track  # noqa: F401
 from .jobs import ETLPlaylistOperation  # noqa: F401
@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .client import StormClient
+from .utils.logging import client_logger
+
+
+class AsyncStormClient:
+    """
+    An asyncio Spotify client with the same methods as StormClient.
+
+    Requests are sent from a pool of `concurrency` workers over a single
+    keep-alive HTTP session sized to match, so thousands of fetches can be
+    awaited together while at most `concurrency` are in flight. All requests
+    still pass through the shared request scheduler.
+    """
+
+    def __init__(self, storm_client=None, concurrency=16):
+        # One page at a time per request, so concurrency bounds every request in flight
+        self.storm_client = storm_client or StormClient(max_page_workers=1)
+        self.concurrency = concurrency
+
+        self.storm_client.sp.resize_pool(concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="storm-client"
+        )
+
+        client_logger.info(f"Async client started with concurrency: {concurrency}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Waits for pending requests and stops the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, method, *args, **kwargs):
+        """Runs a StormClient method on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def get_playlist_tracks(self, playlist_id):
+        """Get all tracks from a playlist."""
+        return await self._run(self.storm_client.get_playlist_tracks, playlist_id)
+
+    async def get_playlist_metadata(self, playlist_id):
+        """Get data about a playlist."""
+        return await self._run(self.storm_client.get_playlist_metadata, playlist_id)
+
+    async def get_artist_albums(self, artist_id):
+        """Get all albums by an artist."""
+        return await self._run(self.storm_client.get_artist_albums, artist_id)
+
+    async def get_new_artist_albums(self, artist_id, known_album_ids, known_totals=None):
+        """Get the albums of an artist that are not in known_album_ids, and the album totals."""
+        return await self._run(
+            self.storm_client.get_new_artist_albums, artist_id, known_album_ids, known_totals
+        )
+
+    async def get_album_tracks(self, album_id):
+        """Get all tracks from an album."""
+        return await self._run(self.storm_client.get_album_tracks, album_id)
+
+    async def get_many_artist_albums(self, artist_ids):
+        """Get all albums for many artists concurrently, as a dictionary by artist ID."""
+        albums = await asyncio.gather(
+            *(self.get_artist_albums(artist_id) for artist_id in artist_ids)
+        )
+        return dict(zip(artist_ids, albums))
@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .utils.logging import database_logger
+
+
+class AsyncStormDB:
+    """
+    An asyncio interface over StormDB for ETL code that overlaps database
+    writes with API fetches.
+
+    Calls run on a bounded thread pool that shares the StormDB connection
+    pool, so they never block the event loop. Query results are fully read
+    in the worker thread and returned as lists.
+    """
+
+    def __init__(self, storm_db, max_workers=8):
+        """Wrap an existing StormDB, or any object with the same methods."""
+        self.storm_db = storm_db
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storm-db"
+        )
+
+        database_logger.info(f"Async database interface started with {max_workers} workers")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Waits for pending calls and stops the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    async def _run(self, method, *args, **kwargs):
+        """Runs a StormDB method on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def _fetch(self, method, *args, **kwargs):
+        """Runs a StormDB query on the worker pool and reads all of its results."""
+        return await self._run(lambda: list(method(*args, **kwargs)))
+
+    # Upserts
+
+    async def update_playlist(self, playlist):
+        return await self._run(self.storm_db.update_playlist, playlist)
+
+    async def update_playlist_tracks(self, playlist_id, tracks, **kwargs):
+        return await self._run(self.storm_db.update_playlist_tracks, playlist_id, tracks, **kwargs)
+
+    async def soft_delete_playlist_tracks(self, playlist_id, **kwargs):
+        return await self._run(self.storm_db.soft_delete_playlist_tracks, playlist_id, **kwargs)
+
+    async def update_artists_from_playlist_tracks(self, playlist_id, **kwargs):
+        return await self._run(
+            self.storm_db.update_artists_from_playlist_tracks, playlist_id, **kwargs
+        )
+
+    async def update_albums_from_artist_albums(self, artist, albums, album_totals=None):
+        return await self._run(
+            self.storm_db.update_albums_from_artist_albums, artist, albums, album_totals
+        )
+
+    async def update_tracks_from_album_tracks(self, album_id, tracks):
+        return await self._run(self.storm_db.update_tracks_from_album_tracks, album_id, tracks)
+
+    async def update_album_track_collection_fail(self, album_id, **kwargs):
+        return await self._run(
+            self.storm_db.update_album_track_collection_fail, album_id, **kwargs
+        )
+
+    # Lookups
+
+    async def get_playlist_snapshot_id(self, playlist_id):
+        return await self._run(self.storm_db.get_playlist_snapshot_id, playlist_id)
+
+    async def get_playlist_track_ids(self, playlist_id):
+        return await self._run(self.storm_db.get_playlist_track_ids, playlist_id)
+
+    async def get_playlist_artists(self, playlist_id):
+        return await self._run(self.storm_db.get_playlist_artists, playlist_id)
+
+    async def get_artist_album_ids(self, artist_id):
+        return await self._run(self.storm_db.get_artist_album_ids, artist_id)
+
+    # Queries
+
+    async def get_playlist_tracks(self, playlist_id, **kwargs):
+        return await self._fetch(self.storm_db.get_playlist_tracks, playlist_id, **kwargs)
+
+    async def get_artists_for_album_collection(self, start_date, **kwargs):
+        return await self._fetch(
+            self.storm_db.get_artists_for_album_collection, start_date, **kwargs
+        )
+
+    async def get_albums_for_track_collection(self, start_date=None, **kwargs):
+        return await self._fetch(
+            self.storm_db.get_albums_for_track_collection, start_date, **kwargs
+        )
+
+    async def get_artists_tracks_by_date(self, artist_ids, start_date, end_date):
+        return await self._fetch(
+            self.storm_db.get_artists_tracks_by_date, artist_ids, start_date, end_date
+        )
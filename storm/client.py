@@ -1,27 +1,164 @@
 from dotenv import load_dotenv
+import time
+import requests
 import spotipy
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy.util import prompt_for_user_token
 from .utils.logging import client_logger
+from .utils.pagination import fetch_all_pages
+from .utils.batching import chunked
+from .utils.scheduler import RequestScheduler
+from .utils.fields import FIELD_PROFILES, strip_fields
+
+# Maximum number of IDs accepted by Spotify's several albums and artists endpoints
+SEVERAL_ALBUMS_LIMIT = 20
+SEVERAL_ARTISTS_LIMIT = 50
+
+# Album groups refreshed separately by incremental discography refreshes
+ARTIST_ALBUM_GROUPS = "album,single"
+
+# Path segments followed by an ID in Spotify API URLs
+RESOURCE_COLLECTIONS = {"albums", "artists", "playlists", "tracks", "users"}
+
+# Shared by every client in the process so all Spotify calls draw from one budget
+spotify_scheduler = RequestScheduler()
+
+
+def endpoint_name(path):
+    """Returns the endpoint of an API path with IDs removed, e.g. playlists/tracks."""
+    segments = path.split("?")[0].strip("/").split("/")
+    return "/".join(
+        segment
+        for i, segment in enumerate(segments)
+        if i == 0 or segments[i - 1] not in RESOURCE_COLLECTIONS
+    )
+
+
+class StormSpotify(spotipy.Spotify):
+    """
+    Spotipy client that sends every request through a RequestScheduler.
+
+    Throttled responses are retried by the scheduler rather than by spotipy's
+    blocking urllib3 retries, so 429s are excluded from its retried statuses.
+
+    If a ResponseCache is given, GET responses of cached endpoints are served
+    from it while fresh and revalidated with their ETag once stale.
+    """
+
+    def __init__(self, scheduler=None, cache=None, **kwargs):
+        kwargs.setdefault("status_forcelist", (500, 502, 503, 504))
+        super().__init__(**kwargs)
+        self.scheduler = scheduler or spotify_scheduler
+        self.cache = cache
+
+    def _build_session(self):
+        super()._build_session()
+        # urllib3 otherwise retries any response carrying Retry-After by sleeping
+        for adapter in self._session.adapters.values():
+            adapter.max_retries = adapter.max_retries.new(respect_retry_after_header=False)
+
+    def resize_pool(self, size):
+        """Sets the number of keep-alive connections kept open per host."""
+        for prefix, adapter in list(self._session.adapters.items()):
+            self._session.mount(
+                prefix,
+                requests.adapters.HTTPAdapter(pool_maxsize=size, max_retries=adapter.max_retries),
+            )
+
+    def _internal_call(self, method, url, payload, params):
+        path = url[len(self.prefix):] if url.startswith(self.prefix) else url
+        endpoint = endpoint_name(path)
+
+        if method == "GET" and self.cache is not None and self.cache.ttl(endpoint) > 0:
+            return self._cached_get(endpoint, url, params)
+
+        return self.scheduler.call(
+            endpoint,
+            lambda: super(StormSpotify, self)._internal_call(method, url, payload, dict(params)),
+        )
+
+    def _cached_get(self, endpoint, url, params):
+        """Serves a GET from the response cache, revalidating or fetching as needed."""
+        key = self.cache.key(url, params)
+        cached = self.cache.get(key)
+        if cached and cached[2]:
+            return cached[0]
+
+        etag = cached[1] if cached else None
+        response = self.scheduler.call(endpoint, self._conditional_get, url, params, etag)
+
+        if response.status_code == 304:
+            self.cache.refresh(key, endpoint)
+            return cached[0]
+
+        results = response.json()
+        self.cache.set(key, endpoint, results, response.headers.get("ETag"))
+        return results
+
+    def _conditional_get(self, url, params, etag=None):
+        """Sends a GET with If-None-Match, raising SpotifyException on errors."""
+        if not url.startswith("http"):
+            url = self.prefix + url
+        headers = self._auth_headers()
+        if etag:
+            headers["If-None-Match"] = etag
+
+        response = self._session.get(
+            url, headers=headers, params=params, proxies=self.proxies,
+            timeout=self.requests_timeout,
+        )
+        if response.status_code >= 400:
+            try:
+                msg = response.json().get("error", {}).get("message")
+            except ValueError:
+                msg = response.text or None
+            raise SpotifyException(
+                response.status_code, -1, f"{response.url}:\n {msg}", headers=response.headers
+            )
+        return response
 
 
 class StormClient:
-    def __init__(self):
+    def __init__(self, max_page_workers=8, scheduler=None, cache=None, field_profile="storm"):
         # Load environment variables from .env file
         load_dotenv()
 
         # Initialize Spotipy client
         client_credentials_manager = SpotifyClientCredentials()
-        self.sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        self.sp = StormSpotify(
+            scheduler=scheduler,
+            cache=cache,
+            client_credentials_manager=client_credentials_manager,
+        )
+
+        # Number of pages fetched concurrently after the first page of a result
+        self.max_page_workers = max_page_workers
+
+        # Fields requested from, or kept from, playlist, album and track responses
+        self.field_profile = FIELD_PROFILES[field_profile]
+
+    def get_request_stats(self):
+        """Get request, throttle and queue wait counters from the request scheduler."""
+        return self.sp.scheduler.stats()
+
+    def get_cache_stats(self):
+        """Get hit and miss counts from the response cache, if one is used."""
+        return self.sp.cache.stats() if self.sp.cache is not None else None
 
     def get_playlist_tracks(self, playlist_id):
         """Get all tracks from a playlist."""
-        items = []
-        results = self.sp.playlist_tracks(playlist_id)
-        while results:
-            items.extend(results["items"])
-            results = self.sp.next(results)
-        return items
+        fields = self.field_profile["playlist_items"]
+        results = self.sp.playlist_tracks(playlist_id, fields=fields, limit=100)
+        items = fetch_all_pages(
+            results,
+            lambda offset, limit: self.sp.playlist_tracks(
+                playlist_id, fields=fields, limit=limit, offset=offset
+            ),
+            self.max_page_workers,
+            self.sp.next,
+        )
+        return strip_fields(items, self.field_profile["drop"])
 
     def get_playlist_metadata(self, playlist_id):
         """Get data about a playlist."""
@@ -32,42 +169,159 @@ class StormClient:
 
     def get_artist_albums(self, artist_id):
         """Get all albums by an artist."""
-        albums = []
-        results = self.sp.artist_albums(artist_id, album_type="album,single")
-        while results:
-            albums.extend(results["items"])
-            results = self.sp.next(results)
-        return albums
+        results = self.sp.artist_albums(artist_id, album_type=ARTIST_ALBUM_GROUPS, limit=50)
+        albums = fetch_all_pages(
+            results,
+            lambda offset, limit: self.sp.artist_albums(
+                artist_id, album_type=ARTIST_ALBUM_GROUPS, limit=limit, offset=offset
+            ),
+            self.max_page_workers,
+            self.sp.next,
+        )
+        return strip_fields(albums, self.field_profile["drop"])
+
+    def get_new_artist_albums(self, artist_id, known_album_ids, known_totals=None):
+        """
+        Get the albums of an artist that are not in known_album_ids.
+
+        Albums and singles are paged in a single request sequence. Paging stops
+        as soon as the new albums found cover the growth of the total since
+        known_totals were reported, so an unchanged discography costs one
+        request. The order of the results is not relied on. Without a known
+        total the discography is paged in full. Returns the new albums and the
+        totals to pass as known_totals on the next refresh.
+        """
+        known_total = (known_totals or {}).get(ARTIST_ALBUM_GROUPS)
+        new_albums = []
+        offset = 0
+        while True:
+            page = self.sp.artist_albums(
+                artist_id, include_groups=ARTIST_ALBUM_GROUPS, limit=50, offset=offset
+            )
+            new_albums.extend(
+                album for album in page["items"] if album["id"] not in known_album_ids
+            )
+
+            if not page.get("next"):
+                break
+            if known_total is not None and len(new_albums) >= page["total"] - known_total:
+                break
+            offset += page["limit"]
+
+        totals = {ARTIST_ALBUM_GROUPS: page["total"]}
+        return strip_fields(new_albums, self.field_profile["drop"]), totals
 
     def get_album_tracks(self, album_id):
         """Get all tracks from an album."""
-        tracks = []
-
         try:
-            results = self.sp.album_tracks(album_id)
-            while results:
-                tracks.extend(results["items"])
-                results = self.sp.next(results)
-            return tracks
+            results = self.sp.album_tracks(album_id, limit=50)
+            tracks = fetch_all_pages(
+                results,
+                lambda offset, limit: self.sp.album_tracks(album_id, limit=limit, offset=offset),
+                self.max_page_workers,
+                self.sp.next,
+            )
+            return strip_fields(tracks, self.field_profile["drop"])
         except Exception as e:
             client_logger.error(f"Error getting album tracks for album: {album_id}")
-            return tracks
+            return []
+
+    def get_several_artists(self, artist_ids):
+        """
+        Get full artist objects, 50 at a time from the several artists endpoint.
+
+        Artists are returned whole regardless of the field profile, since this is
+        used to collect their full metadata. Returns the artists and the IDs
+        Spotify returned no artist for, IDs of batches that failed are in neither.
+        """
+        artists = []
+        missing = []
+        for batch in chunked(artist_ids, SEVERAL_ARTISTS_LIMIT):
+            try:
+                results = self.sp.artists(batch)
+            except Exception as e:
+                client_logger.error(f"Error getting artists: {batch}, {e}")
+                continue
+
+            for artist_id, artist in zip(batch, results["artists"]):
+                if artist:
+                    artists.append(artist)
+                else:
+                    missing.append(artist_id)
+
+        return artists, missing
+
+    def get_several_album_tracks(self, album_ids):
+        """
+        Get all tracks for several albums.
+
+        Albums are hydrated 20 at a time from the several albums endpoint, which
+        embeds the first page of tracks. Only albums with more tracks than the
+        embedded page are paginated further. Returns a dictionary of album ID to
+        tracks, albums Spotify did not return or whose tracks failed map to an
+        empty list. Albums of a batch whose request failed are left out, so a
+        transient error is not mistaken for a missing album.
+        """
+        album_tracks = {}
+        for batch in chunked(album_ids, SEVERAL_ALBUMS_LIMIT):
+            try:
+                albums = self.sp.albums(batch)["albums"]
+            except Exception as e:
+                client_logger.error(f"Error getting albums: {batch}, {e}")
+                continue
+
+            for album_id, album in zip(batch, albums):
+                if not album or not album.get("tracks"):
+                    client_logger.error(f"Album not returned by Spotify: {album_id}")
+                    album_tracks[album_id] = []
+                    continue
+
+                try:
+                    tracks = fetch_all_pages(
+                        album["tracks"],
+                        lambda offset, limit, album_id=album_id: self.sp.album_tracks(
+                            album_id, limit=limit, offset=offset
+                        ),
+                        self.max_page_workers,
+                        self.sp.next,
+                    )
+                    album_tracks[album_id] = strip_fields(tracks, self.field_profile["drop"])
+                except Exception as e:
+                    client_logger.error(f"Error getting album tracks for album: {album_id}, {e}")
+                    album_tracks[album_id] = []
+
+        return album_tracks
 
 
 class StormUserClient:
     """
     Storm Client with user permissions. Needed for writing to a user's account.
+
+    Playlist lookups by name use an index of all the user's playlists, built
+    once and rebuilt after `playlist_index_ttl` seconds.
     """
 
-    def __init__(self, user_id):
+    def __init__(self, user_id, scheduler=None, playlist_index_ttl=3600):
         # Initialize Spotipy client
         auth_manager = spotipy.oauth2.SpotifyOAuth(scope="playlist-modify-private playlist-modify-public", cache_path=".cache", show_dialog=True, open_browser=True, username=user_id, redirect_uri="http://localhost/")
-        self.sp = spotipy.Spotify(auth_manager=auth_manager)
+        self.sp = StormSpotify(scheduler=scheduler, auth_manager=auth_manager)
 
         self.user_id = user_id
 
-    def add_tracks_to_playlist(self, playlist_id, track_ids, overwrite=False):
-        """Write tracks to a playlist in batches."""
+        self.playlist_index_ttl = playlist_index_ttl
+        self._playlist_index = None
+        self._playlist_index_built_at = None
+
+    def add_tracks_to_playlist(self, playlist_id, track_ids, overwrite=False, sync=False):
+        """Write tracks to a playlist in batches.
+
+        With sync, the playlist is made to hold exactly track_ids by applying
+        only the differences with its current contents.
+        """
+        if sync:
+            self.sync_playlist_tracks(playlist_id, track_ids)
+            return
+
         batch_size = 100  # Spotify's limit for adding tracks in a single request
         for i in range(0, len(track_ids), batch_size):
             batch = track_ids[i:i + batch_size]
@@ -81,19 +335,89 @@ class StormUserClient:
 
         client_logger.info(f"Added a total of {len(track_ids)} tracks to playlist: {playlist_id}")
 
-    def add_tracks_to_playlist_by_name(self, playlist_name, track_ids, make_new=False, overwrite=False):
+    def sync_playlist_tracks(self, playlist_id, track_ids):
+        """
+        Make a playlist hold exactly the given tracks with the fewest writes.
+
+        Tracks no longer wanted are removed in batches guarded by the snapshot
+        the contents were read at, then missing tracks are appended. Tracks
+        already in the playlist keep their position.
+        """
+        batch_size = 100  # Spotify's limit for changing tracks in a single request
+        snapshot_id, current_ids = self.get_playlist_track_ids(playlist_id)
+
+        target_ids = list(dict.fromkeys(track_ids))
+        target = set(target_ids)
+        current = set(current_ids)
+        removals = [track_id for track_id in dict.fromkeys(current_ids) if track_id not in target]
+        additions = [track_id for track_id in target_ids if track_id not in current]
+
+        for batch in chunked(removals, batch_size):
+            snapshot_id = self.sp.playlist_remove_all_occurrences_of_items(
+                playlist_id, batch, snapshot_id=snapshot_id
+            )["snapshot_id"]
+
+        for batch in chunked(additions, batch_size):
+            self.sp.playlist_add_items(playlist_id, batch)
+
+        client_logger.info(
+            f"Synced playlist: {playlist_id}, {len(additions)} added, {len(removals)} removed"
+        )
+        return len(additions), len(removals)
+
+    def get_playlist_track_ids(self, playlist_id):
+        """Get the snapshot ID and the track IDs of a playlist, in playlist order."""
+        snapshot_id = self.sp.playlist(playlist_id, fields="snapshot_id")["snapshot_id"]
+
+        track_ids = []
+        results = self.sp.playlist_items(
+            playlist_id, fields="items(track(id)),next", limit=100, additional_types=("track",)
+        )
+        while results:
+            track_ids.extend(
+                item["track"]["id"]
+                for item in results["items"]
+                if item.get("track") and item["track"].get("id")
+            )
+            results = self.sp.next(results) if results.get("next") else None
+
+        return snapshot_id, track_ids
+
+    def add_tracks_to_playlist_by_name(
+        self, playlist_name, track_ids, make_new=False, overwrite=False, sync=False
+    ):
         """Add tracks to a playlist by name."""
         playlist_id = self.get_playlist_id_by_name(playlist_name)
         if not playlist_id and make_new:
             playlist_id = self.create_playlist(playlist_name)
-        self.add_tracks_to_playlist(playlist_id, track_ids, overwrite=overwrite)
+        self.add_tracks_to_playlist(playlist_id, track_ids, overwrite=overwrite, sync=sync)
+
+    def get_playlist_index(self, refresh=False):
+        """Get an index of playlist name to ID across all of the user's playlists."""
+        expired = (
+            self._playlist_index is None
+            or time.monotonic() - self._playlist_index_built_at > self.playlist_index_ttl
+        )
+        if refresh or expired:
+            index = {}
+            results = self.sp.current_user_playlists(limit=50)
+            while results:
+                for playlist in results["items"]:
+                    # Keep the first match for duplicate names, as lookups always have
+                    index.setdefault(playlist["name"], playlist["id"])
+                results = self.sp.next(results) if results.get("next") else None
+
+            self._playlist_index = index
+            self._playlist_index_built_at = time.monotonic()
+            client_logger.info(f"Indexed {len(index)} playlists for user: {self.user_id}")
+
+        return self._playlist_index
 
     def get_playlist_id_by_name(self, playlist_name):
         """Get the ID of a playlist by name."""
-        playlists = self.sp.current_user_playlists()
-        for playlist in playlists["items"]:
-            if playlist["name"] == playlist_name:
-                return playlist["id"]
+        playlist_id = self.get_playlist_index().get(playlist_name)
+        if playlist_id:
+            return playlist_id
 
         client_logger.error(f"Playlist not found: {playlist_name}")
         return None
@@ -103,6 +427,9 @@ class StormUserClient:
         playlist = self.sp.user_playlist_create(self.user_id, playlist_name)
         playlist_id = playlist["id"]
 
+        if self._playlist_index is not None:
+            self._playlist_index[playlist_name] = playlist_id
+
         client_logger.info(f"Created new playlist: {playlist_id}")
         return playlist_id
 
@@ -1,11 +1,99 @@
-from pymongo import MongoClient
-from storm.objects import StormConfig, Playlist, Track, PlaylistTrack, Artist, Album, ArtistBlacklist
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+from storm.objects import (
+    StormConfig,
+    Playlist,
+    Track,
+    PlaylistTrack,
+    Artist,
+    Album,
+    ArtistBlacklist,
+    OperationCheckpoint,
+    parse_release_date,
+)
 
 from .utils.logging import database_logger
+from .utils.batching import chunked
+from .utils.pool_stats import PoolStatsListener
 from mongoengine import connect
 from mongoengine.queryset.visitor import Q
 
-from datetime import datetime
+from datetime import datetime, timedelta
+import re
+
+
+# Shared by every connection in the process so repeated connects reuse the same pool
+pool_stats = PoolStatsListener()
+
+# Error code of writes rejected for an existing _id
+DUPLICATE_KEY = 11000
+
+# Documents with declared indexes, checked by StormDB.ensure_indexes
+INDEXED_DOCUMENTS = [Track, Album, Artist, PlaylistTrack, ArtistBlacklist]
+
+# Albums failing track collection are retried after base delay * 2 ** (failures - 1),
+# and quarantined once they have failed max attempts times
+TRACK_COLLECTION_BASE_DELAY = timedelta(hours=6)
+TRACK_COLLECTION_MAX_ATTEMPTS = 6
+
+
+def _upsert_operation(document):
+    """Builds a bulk upsert operation that sets all stored fields of a document."""
+    fields = document.to_mongo().to_dict()
+    document_id = fields.pop("_id")
+    return UpdateOne({"_id": document_id}, {"$set": fields}, upsert=True)
+
+
+def _track_collection_fail_update(base_delay, max_attempts):
+    """
+    Builds an update pipeline that increments an album's track collection fail
+    count and, in the same write, schedules its next attempt base_delay *
+    2 ** (failures - 1) from now, or quarantines it after max_attempts failures.
+    """
+    fail_count = "$track_collection_fail_count"
+    delay_ms = base_delay.total_seconds() * 1000
+    next_attempt = {
+        "$add": [
+            datetime.now(),
+            {"$multiply": [delay_ms, {"$pow": [2, {"$subtract": [fail_count, 1]}]}]},
+        ]
+    }
+    return [
+        {"$set": {"track_collection_fail_count": {"$add": [{"$ifNull": [fail_count, 0]}, 1]}}},
+        {
+            "$set": {
+                "next_track_collection_attempt": {
+                    "$cond": [{"$gte": [fail_count, max_attempts]}, None, next_attempt]
+                }
+            }
+        },
+    ]
+
+
+def _tracks_collected_update():
+    """Builds an update marking an album's tracks as collected and clearing its failure backoff."""
+    return {
+        "$set": {"tracks_collected_date": datetime.now()},
+        "$unset": {"next_track_collection_attempt": "", "track_collection_fail_count": ""},
+    }
+
+
+def _project(queryset, fields=None):
+    """
+    Returns a queryset as hydrated documents, or as raw dictionaries holding
+    only the specified fields if a projection is given.
+    """
+    if fields is None:
+        return queryset
+    return queryset.only(*fields).as_pymongo()
+
+
+def _as_datetime(date):
+    """Converts a "%Y-%m-%d" date string to a datetime, datetimes pass through."""
+    if isinstance(date, str):
+        return datetime.strptime(date, "%Y-%m-%d")
+    return date
 
 
 class StormDB:
@@ -14,14 +102,98 @@ class StormDB:
     interface API for interacting with the MongoDB database.
     """
 
-    def __init__(self, host="localhost", port=27017, db_name="storm_database"):
-        """Initialize the MongoDB client."""
-        self.client = MongoClient(host, port)
+    _shared = {}
+
+    def __init__(
+        self,
+        host="localhost",
+        port=27017,
+        db_name="storm_database",
+        max_pool_size=100,
+        min_pool_size=0,
+        connect_timeout_ms=20000,
+        socket_timeout_ms=None,
+        server_selection_timeout_ms=30000,
+        wait_queue_timeout_ms=None,
+        compressors=None,
+        read_preference="primary",
+    ):
+        """
+        Initialize the MongoDB connection pool.
+
+        A single pymongo client is created through mongoengine and used by both
+        the document and raw collection paths.
+        """
+        self.client = connect(
+            db_name,
+            host=host,
+            port=port,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            connectTimeoutMS=connect_timeout_ms,
+            socketTimeoutMS=socket_timeout_ms,
+            serverSelectionTimeoutMS=server_selection_timeout_ms,
+            waitQueueTimeoutMS=wait_queue_timeout_ms,
+            compressors=compressors,
+            read_preference=make_read_preference(read_pref_mode_from_name(read_preference), None),
+            event_listeners=[pool_stats],
+        )
         self.db = self.client[db_name]
-        connect(db_name, host=host, port=port)
 
         database_logger.info(f"Connected to MongoDB at {host}:{port}")
 
+    @classmethod
+    def shared(cls, **kwargs):
+        """Returns a StormDB for the given settings, reused within the process."""
+        key = tuple(sorted(kwargs.items()))
+        if key not in cls._shared:
+            cls._shared[key] = cls(**kwargs)
+        return cls._shared[key]
+
+    def get_pool_stats(self):
+        """Returns connection pool checkout counts and wait times."""
+        return pool_stats.stats()
+
+    def ensure_indexes(self):
+        """
+        Creates the indexes declared on each document and verifies them.
+
+        Returns a report per collection with declared indexes that are still
+        missing, indexes that exist but are not declared, and indexes that
+        have not been used since the server started.
+        """
+        report = {}
+        for document in INDEXED_DOCUMENTS:
+            document.ensure_indexes()
+            comparison = document.compare_indexes()
+            collection = document._get_collection()
+
+            report[collection.name] = {
+                "missing": comparison["missing"],
+                "extra": comparison["extra"],
+                "unused": self._get_unused_indexes(collection),
+            }
+
+            for status, indexes in report[collection.name].items():
+                for index in indexes:
+                    database_logger.warning(f"Index {status} on {collection.name}: {index}")
+
+        database_logger.info(f"Ensured indexes for {len(INDEXED_DOCUMENTS)} collections")
+        return report
+
+    def _get_unused_indexes(self, collection):
+        """Returns the names of indexes with no recorded accesses, excluding _id."""
+        try:
+            stats = collection.aggregate([{"$indexStats": {}}])
+            return [
+                index["name"]
+                for index in stats
+                if index["name"] != "_id_" and index["accesses"]["ops"] == 0
+            ]
+        except OperationFailure as e:
+            database_logger.warning(f"Index usage unavailable for {collection.name}: {e}")
+            return []
+
     def create_new_storm_config(self, storm_name, input_playlist, target_playlist):
         """Creates a new storm configuration in the database."""
         config = StormConfig(
@@ -54,66 +226,208 @@ class StormDB:
 
         database_logger.info(f"Updated playlist: {playlist['id']}")
 
-    def update_playlist_tracks(self, playlist_id, tracks, flag_deleted=False):
-        """Updates the playlist tracks in the database."""
+    def update_playlist_tracks(
+        self, playlist_id, tracks, flag_deleted=False, bulk=False, batch_size=1000
+    ):
+        """Updates the playlist tracks in the database.
+
+        In bulk mode playlist tracks and their nested tracks are upserted in
+        unordered batches of `batch_size`, and missing tracks are soft deleted
+        with a single update.
+        """
+        if bulk:
+            return self._bulk_update_playlist_tracks(
+                playlist_id, tracks, flag_deleted, batch_size
+            )
+
         for track in tracks:
             track.update({"playlist_id": playlist_id})
             PlaylistTrack.from_json(track).save()
 
         if flag_deleted:
+            track_ids = {
+                PlaylistTrack.make_id(track["track"]["id"], playlist_id) for track in tracks
+            }
             for track in PlaylistTrack.objects(playlist_id=playlist_id):
-                if track not in tracks:
+                if track._id not in track_ids:
                     track.soft_delete()
-                    track.save()
 
         database_logger.info(f"Updated playlist tracks: {len(tracks)}")
 
-    def update_artists_from_tracks(self):
+    def _bulk_update_playlist_tracks(self, playlist_id, tracks, flag_deleted, batch_size):
+        """Upserts playlist tracks and their nested tracks with batched bulk writes."""
+        playlist_track_ids = []
+        for batch in chunked(tracks, batch_size):
+            playlist_track_operations = []
+            track_operations = []
+            for track in batch:
+                # Local and unavailable tracks come back without an id
+                if not track.get("track") or not track["track"].get("id"):
+                    continue
+
+                track.update({"playlist_id": playlist_id})
+                playlist_track = PlaylistTrack.from_json(track)
+                playlist_track_ids.append(playlist_track._id)
+                playlist_track_operations.append(_upsert_operation(playlist_track))
+                track_operations.append(_upsert_operation(Track.from_json(track["track"])))
+
+            if playlist_track_operations:
+                PlaylistTrack._get_collection().bulk_write(
+                    playlist_track_operations, ordered=False
+                )
+                Track._get_collection().bulk_write(track_operations, ordered=False)
+
+        if flag_deleted:
+            self.soft_delete_playlist_tracks(playlist_id, exclude_ids=playlist_track_ids)
+
+        database_logger.info(f"Bulk updated playlist tracks: {len(playlist_track_ids)}")
+
+    def soft_delete_playlist_tracks(self, playlist_id, ids=None, exclude_ids=None):
+        """Soft deletes active tracks of a playlist.
+
+        Only playlist tracks in `ids` are deleted if given, and those in
+        `exclude_ids` are always kept.
+        """
+        query = {"playlist_id": playlist_id, "sys_is_deleted": {"$ne": True}}
+        id_filter = {}
+        if ids is not None:
+            id_filter["$in"] = list(ids)
+        if exclude_ids is not None:
+            id_filter["$nin"] = list(exclude_ids)
+        if id_filter:
+            query["_id"] = id_filter
+
+        result = PlaylistTrack._get_collection().update_many(
+            query, {"$set": {"sys_is_deleted": True, "sys_last_updated": datetime.now()}}
+        )
+
+        database_logger.info(f"Soft deleted playlist tracks: {result.modified_count}")
+        return result.modified_count
+
+    def get_playlist_snapshot_id(self, playlist_id):
+        """Returns the stored snapshot ID of a playlist, or None if it is not stored."""
+        playlist = Playlist._get_collection().find_one(
+            {"_id": playlist_id}, {"snapshot_id": 1}
+        )
+        return playlist.get("snapshot_id") if playlist else None
+
+    def get_playlist_track_ids(self, playlist_id):
+        """Returns the IDs of all playlist tracks that are not soft deleted."""
+        cursor = PlaylistTrack._get_collection().find(
+            {"playlist_id": playlist_id, "sys_is_deleted": {"$ne": True}}, {"_id": 1}
+        )
+        return {playlist_track["_id"] for playlist_track in cursor}
+
+    def update_artists_from_tracks(self, batch_size=1000):
         """
         Creates artists from tracks in the database.
 
         if the artist already exists it will not update.
         """
+        tracks = Track._get_collection().find({}, {"artists": 1})
+        artists = (artist for track in tracks for artist in track.get("artists") or [])
+        created = self._insert_new_documents(Artist, artists, batch_size)
 
-        Track.objects()
-        for track in Track.objects():
-            artists = track["artists"]
-            for artist in artists:
-                artist_id = artist["id"] if "id" in artist else None
-                if artist_id:
-                    if not Artist.objects(_id=artist_id).first():
-                        database_logger.info(
-                            f"New artist found in tracks: {artist_id}, {artist['name'] if 'name' in artist else 'No Artist Name'}"
-                        )
-                        Artist.from_json(artist).save()
+        database_logger.info(f"Updated artists from tracks, new artists: {created}")
 
-        database_logger.info("Updated artists from tracks.")
-
-    def update_artists_from_playlist_tracks(self, playlist_id):
+    def update_artists_from_playlist_tracks(self, playlist_id, batch_size=1000):
         """Updates the artists from the playlist tracks in the database."""
-        tracks = PlaylistTrack.objects(playlist_id=playlist_id)
-        for track in tracks:
-            for artist in track.get_artists(id_only=False):
-                if not Artist.objects(_id=artist["id"]).first():
-                    Artist.from_json(artist).save()
+        tracks = PlaylistTrack._get_collection().find(
+            {"playlist_id": playlist_id}, {"track.artists": 1}
+        )
+        artists = (
+            artist for track in tracks for artist in track.get("track", {}).get("artists") or []
+        )
+        created = self._insert_new_documents(Artist, artists, batch_size)
+
+        database_logger.info(
+            f"Updated artists from playlist tracks: {playlist_id}, new artists: {created}"
+        )
 
-        database_logger.info(f"Updated artists from playlist tracks: {len(tracks)}")
+    def _insert_new_documents(self, document, items, batch_size=1000):
+        """
+        Inserts the Spotify objects whose IDs are not yet in the document's collection.
 
-    def update_albums_from_artist_albums(self, artist, albums):
-        """Updates the artist albums in the database."""
-        for album in albums:
-            if not Album.objects(_id=album["id"]).first():
-                Album.from_json(album).save()
+        Existing documents are resolved with one $in query per batch of IDs and
+        new ones are written with an unordered insert_many. Returns the number
+        of documents inserted.
+        """
+        candidates = {}
+        for item in items:
+            if item.get("id") and item["id"] not in candidates:
+                candidates[item["id"]] = item
+
+        collection = document._get_collection()
+        created = 0
+        for batch in chunked(candidates, batch_size):
+            existing = {
+                stored["_id"] for stored in collection.find({"_id": {"$in": batch}}, {"_id": 1})
+            }
+            new_documents = [
+                document.from_json(candidates[item_id]).to_mongo().to_dict()
+                for item_id in batch
+                if item_id not in existing
+            ]
+            if not new_documents:
+                continue
+
+            for new_document in new_documents:
+                database_logger.debug(
+                    f"New {collection.name} found: {new_document['_id']}, {new_document['name']}"
+                )
+
+            try:
+                collection.insert_many(new_documents, ordered=False)
+                created += len(new_documents)
+            except BulkWriteError as e:
+                # Documents inserted by a concurrent run are already stored,
+                # any other write error is raised
+                created += e.details["nInserted"]
+                errors = [
+                    error for error in e.details["writeErrors"] if error["code"] != DUPLICATE_KEY
+                ]
+                if errors:
+                    database_logger.error(
+                        f"Failed to insert {len(errors)} {document.__name__} documents: "
+                        f"{errors[0]['errmsg']}"
+                    )
+                    raise
+
+        return created
+
+    def update_albums_from_artist_albums(self, artist, albums, album_totals=None):
+        """Updates the artist albums in the database.
+
+        If album_totals are provided they are stored on the artist, for
+        incremental discography refreshes to compare against.
+        """
+        created = self._insert_new_documents(Album, albums)
+
+        update = {"last_album_update": datetime.now()}
+        if album_totals is not None:
+            update["album_totals"] = album_totals
+        Artist._get_collection().update_one({"_id": artist["_id"]}, {"$set": update})
+
+        database_logger.info(f"Updated albums for artist: {artist['_id']}, new albums: {created}")
 
-        Artist.objects(_id=artist["_id"]).first().update_album_date()
+    def get_artist_album_ids(self, artist_id):
+        """Returns the IDs of all stored albums for the specified artist."""
+        albums = Album._get_collection().find({"artists.id": artist_id}, {"_id": 1})
+        return {album["_id"] for album in albums}
 
-    def get_artists_for_album_collection(self, start_date, return_missing=True):
+    def get_artists_for_album_collection(
+        self, start_date, return_missing=True, fields=None, artist_ids=None
+    ):
         """Returns all artists for the album collection.
 
         If an end date is provided, only artists with albums updated between
         the start and end date will be returned.
 
         If an artist has no last_album_update, they will be returned if return_missing is True.
+
+        If artist_ids are provided, only those artists are returned.
+
+        If fields are provided, artists are returned as raw dictionaries of those fields.
         """
         query = Q()
 
@@ -123,10 +437,83 @@ class StormDB:
         if return_missing:
             query |= Q(last_album_update__exists=False)
 
-        return Artist.objects(query)
+        if artist_ids is not None:
+            query &= Q(pk__in=list(artist_ids))
+
+        return _project(Artist.objects(query), fields)
+
+    def get_artists_for_enrichment(self, stale_before=None, fields=None):
+        """Returns artists without full metadata.
+
+        If stale_before is provided, artists whose metadata was last collected
+        before that date are returned as well.
+
+        If fields are provided, artists are returned as raw dictionaries of those fields.
+        """
+        query = Q(metadata_updated=None)
+
+        if stale_before:
+            query |= Q(metadata_updated__lte=stale_before)
+
+        return _project(Artist.objects(query), fields)
+
+    def update_artists_metadata(self, artists, batch_size=1000):
+        """Writes full artist objects from Spotify onto stored artists with bulk updates."""
+        collection = Artist._get_collection()
+        updated = 0
+        for batch in chunked(artists, batch_size):
+            now = datetime.now()
+            operations = [
+                UpdateOne(
+                    {"_id": artist["id"]},
+                    {
+                        "$set": {
+                            "name": artist["name"],
+                            "external_urls": artist.get("external_urls", {}),
+                            "followers": artist.get("followers", {}),
+                            "genres": artist.get("genres", []),
+                            "href": artist.get("href"),
+                            "popularity": artist.get("popularity"),
+                            "images": artist.get("images", []),
+                            "type": artist.get("type"),
+                            "last_updated": now,
+                            "metadata_updated": now,
+                            "metadata_missing": False,
+                        }
+                    },
+                )
+                for artist in batch
+            ]
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+
+        database_logger.info(f"Updated artist metadata: {updated}")
+        return updated
+
+    def update_artists_metadata_missing(self, artist_ids):
+        """
+        Flags artists Spotify returned no metadata for.
+
+        Their metadata_updated is set so they are only requested again once stale.
+        """
+        if not artist_ids:
+            return 0
+
+        result = Artist._get_collection().update_many(
+            {"_id": {"$in": list(artist_ids)}},
+            {"$set": {"metadata_missing": True, "metadata_updated": datetime.now()}},
+        )
+
+        database_logger.warning(f"Artists missing from Spotify: {result.modified_count}")
+        return result.modified_count
 
     def get_albums_for_track_collection(
-        self, start_date=None, only_return_missing=True
+        self,
+        start_date=None,
+        only_return_missing=True,
+        fields=None,
+        after_id=None,
+        limit=None,
+        max_attempts=TRACK_COLLECTION_MAX_ATTEMPTS,
     ):
         """Returns all albums for the track collection.
 
@@ -134,6 +521,15 @@ class StormDB:
         the start and end date will be returned.
 
         If an album has no tracks_collected_date, they will be returned if return_missing is True.
+
+        Albums waiting out a failure backoff, or quarantined after max_attempts
+        failures, are not returned.
+
+        If fields are provided, albums are returned as raw dictionaries of those fields.
+
+        If a limit is provided, at most that many albums are returned in ID order,
+        starting after after_id. Passing the last ID returned pages through the
+        albums without holding a cursor open.
         """
         query = Q()
 
@@ -143,7 +539,21 @@ class StormDB:
         if only_return_missing:
             query &= Q(tracks_collected_date__exists=False)
 
-        return Album.objects(query)
+        query &= Q(next_track_collection_attempt=None) | Q(
+            next_track_collection_attempt__lte=datetime.now()
+        )
+        query &= Q(track_collection_fail_count=None) | Q(
+            track_collection_fail_count__lt=max_attempts
+        )
+
+        if after_id is not None:
+            query &= Q(pk__gt=after_id)
+
+        albums = Album.objects(query)
+        if limit:
+            albums = albums.order_by("_id").limit(limit)
+
+        return _project(albums, fields)
 
     def update_tracks_from_album_tracks(self, album_id, tracks):
         """Updates the album tracks in the database."""
@@ -151,17 +561,129 @@ class StormDB:
             track.update({"album": {"id": album_id}})
             Track.from_json(track).save()
 
-        Album.objects(_id=album_id).first().update_tracks_collected_date()
+        Album._get_collection().update_one({"_id": album_id}, _tracks_collected_update())
         database_logger.info(f"Updated album tracks: {len(tracks)}")
 
-    def update_album_track_collection_fail(self, album_id):
-        """Updates the album track collection fail count in the database."""
-        album = Album.objects(_id=album_id).first()
-        album.increment_track_collection_fail_count()
-        album.save()
+    def update_tracks_from_several_album_tracks(
+        self,
+        album_tracks,
+        base_delay=TRACK_COLLECTION_BASE_DELAY,
+        max_attempts=TRACK_COLLECTION_MAX_ATTEMPTS,
+    ):
+        """
+        Writes the tracks of several albums with a single bulk upsert.
 
-        database_logger.warning(
-            f"Album fail count at: {album.track_collection_fail_count} for album: {album_id}"
+        Takes a dictionary of album ID to tracks. Albums with tracks are marked
+        as collected, albums without tracks are scheduled for a retry, see
+        update_album_track_collection_fail. Albums left out of the dictionary
+        are not updated. Returns the IDs of the collected and failed albums.
+        """
+        collected = [album_id for album_id, tracks in album_tracks.items() if tracks]
+        failed = [album_id for album_id, tracks in album_tracks.items() if not tracks]
+
+        operations = []
+        for album_id in collected:
+            for track in album_tracks[album_id]:
+                track.update({"album": {"id": album_id}})
+                operations.append(_upsert_operation(Track.from_json(track)))
+
+        if operations:
+            Track._get_collection().bulk_write(operations, ordered=False)
+
+        collection = Album._get_collection()
+        if collected:
+            collection.update_many({"_id": {"$in": collected}}, _tracks_collected_update())
+        if failed:
+            update = _track_collection_fail_update(base_delay, max_attempts)
+            collection.bulk_write(
+                [UpdateOne({"_id": album_id}, update) for album_id in failed], ordered=False
+            )
+            database_logger.warning(f"Album track collection failed for albums: {failed}")
+
+            quarantined = [
+                album["_id"]
+                for album in collection.find(
+                    {"_id": {"$in": failed}, "track_collection_fail_count": {"$gte": max_attempts}},
+                    {"_id": 1},
+                )
+            ]
+            if quarantined:
+                database_logger.warning(
+                    f"Quarantined albums after {max_attempts} failures: {quarantined}"
+                )
+
+        database_logger.info(
+            f"Updated album tracks: {len(operations)} across {len(collected)} albums"
+        )
+        return collected, failed
+
+    def backfill_album_release_dates(self, batch_size=1000):
+        """
+        Fills in release_datetime for albums stored before it was introduced.
+
+        Albums whose release date cannot be parsed are stored with a null
+        release_datetime so they are not revisited.
+        """
+        collection = Album._get_collection()
+        albums = collection.find(
+            {"release_datetime": {"$exists": False}},
+            {"release_date": 1, "release_date_precision": 1},
+        )
+
+        updated = 0
+        for batch in chunked(albums, batch_size):
+            operations = [
+                UpdateOne(
+                    {"_id": album["_id"]},
+                    {
+                        "$set": {
+                            "release_datetime": parse_release_date(
+                                album.get("release_date"), album.get("release_date_precision")
+                            )
+                        }
+                    },
+                )
+                for album in batch
+            ]
+            collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+
+        database_logger.info(f"Backfilled album release dates: {updated}")
+        return updated
+
+    def update_album_track_collection_fail(
+        self,
+        album_id,
+        base_delay=TRACK_COLLECTION_BASE_DELAY,
+        max_attempts=TRACK_COLLECTION_MAX_ATTEMPTS,
+    ):
+        """
+        Updates the album track collection fail count in the database.
+
+        The next attempt is scheduled base_delay * 2 ** (failures - 1) from now,
+        albums that have failed max_attempts times are quarantined.
+        """
+        album = Album._get_collection().find_one_and_update(
+            {"_id": album_id},
+            _track_collection_fail_update(base_delay, max_attempts),
+            projection={"track_collection_fail_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not album:
+            return
+
+        fail_count = album["track_collection_fail_count"]
+        database_logger.warning(f"Album fail count at: {fail_count} for album: {album_id}")
+        if fail_count >= max_attempts:
+            database_logger.warning(f"Quarantined album after {max_attempts} failures: {album_id}")
+
+    def get_quarantined_albums(self, max_attempts=TRACK_COLLECTION_MAX_ATTEMPTS, fields=None):
+        """Returns albums without tracks that have failed track collection max_attempts times."""
+        return _project(
+            Album.objects(
+                tracks_collected_date__exists=False, track_collection_fail_count__gte=max_attempts
+            ),
+            fields,
         )
 
     def blacklist_artists_from_playlist(self, playlist_id, storm_name):
@@ -173,49 +695,47 @@ class StormDB:
             if not ArtistBlacklist.objects(_id=artist["_id"]).first():
                 ArtistBlacklist(_id=artist["_id"], storm_name=storm_name).save()
 
-    def get_blacklisted_artists(self, storm_name):
+    def get_blacklisted_artists(self, storm_name, fields=None):
         """Returns all blacklisted artists for the specified storm."""
-        return ArtistBlacklist.objects(storm_name=storm_name)
+        return _project(ArtistBlacklist.objects(storm_name=storm_name), fields)
     
-    def get_playlist_tracks(self, playlist_id, include_deleted=False):
+    def get_playlist_tracks(self, playlist_id, include_deleted=False, fields=None):
         """Returns all tracks for the specified playlist."""
-        if include_deleted:
-            return PlaylistTrack.objects(playlist_id=playlist_id)
-        return PlaylistTrack.objects(playlist_id=playlist_id)
+        query = Q(playlist_id=playlist_id)
+        if not include_deleted:
+            query &= Q(sys_is_deleted__ne=True)
+        return _project(PlaylistTrack.objects(query), fields)
     
     def get_playlist_artists(self, playlist_id):
         """Returns all artists for the specified playlist."""
-        tracks = self.get_playlist_tracks(playlist_id)
+        tracks = self.get_playlist_tracks(playlist_id, fields=["track.artists"])
         artists = []
         for track in tracks:
-            artists.extend(track.get_artists())
+            artists.extend(artist["id"] for artist in track["track"]["artists"])
         return list(set(artists))
     
-    def get_artist_albums(self, artist_id):
+    def get_artist_albums(self, artist_id, fields=None):
         """Returns all albums for the specified artist."""
-        albums = Album.objects.all()
-        return [album for album in albums if any(artist['id'] == artist_id for artist in album.artists)]
+        return _project(Album.objects(artists__id=artist_id), fields)
 
-    def get_artist_albums_by_date(self, artist_id, start_date, end_date):
+    def get_artist_albums_by_date(self, artist_id, start_date, end_date, fields=None):
         """Returns all albums for the specified artist between the specified dates."""
         
-        query = Q()
+        query = Q(artists__id=artist_id)
         if start_date:
-            query &= Q(release_date__gte=start_date)
+            query &= Q(release_datetime__gte=_as_datetime(start_date))
         if end_date:
-            query &= Q(release_date__lte=end_date)
+            query &= Q(release_datetime__lte=_as_datetime(end_date))
         
-        albums = Album.objects(query)
-        return [album for album in albums if any(artist['id'] == artist_id for artist in album.artists)]
+        return _project(Album.objects(query), fields)
 
-    def get_artist_tracks(self, artist_id):
+    def get_artist_tracks(self, artist_id, fields=None):
         """Returns all tracks where artist_id is in the "artist" list on the track."""
-        tracks = Track.objects.all()
-        return [track for track in tracks if any(artist['id'] == artist_id for artist in track.artists)]
+        return _project(Track.objects(artists__id=artist_id), fields)
 
     def get_artist_tracks_by_date(self, artist_id, start_date, end_date):
         """Returns all tracks for the specified artist between the specified dates"""
-        albums = self.get_artist_albums_by_date(artist_id, start_date, end_date)
+        albums = self.get_artist_albums_by_date(artist_id, start_date, end_date, fields=["_id"])
         tracks = []
         for album in albums:
             album_tracks = Track.objects.filter(album__id=album['_id'])
@@ -223,3 +743,75 @@ class StormDB:
         
         return tracks
 
+    def get_artists_tracks_by_date(self, artist_ids, start_date, end_date):
+        """
+        Returns the tracks of all albums by any of the specified artists released
+        between the specified dates.
+
+        Albums are matched and joined to their tracks in a single aggregation,
+        tracks are returned as raw dictionaries.
+        """
+        match = {"artists.id": {"$in": list(artist_ids)}}
+        release_datetime = {}
+        if start_date:
+            release_datetime["$gte"] = _as_datetime(start_date)
+        if end_date:
+            release_datetime["$lte"] = _as_datetime(end_date)
+        if release_datetime:
+            match["release_datetime"] = release_datetime
+
+        pipeline = [
+            {"$match": match},
+            {"$project": {"_id": 1}},
+            {
+                "$lookup": {
+                    "from": Track._get_collection_name(),
+                    "localField": "_id",
+                    "foreignField": "album.id",
+                    "as": "tracks",
+                }
+            },
+            {"$unwind": "$tracks"},
+            {"$replaceRoot": {"newRoot": "$tracks"}},
+        ]
+        return list(Album._get_collection().aggregate(pipeline, allowDiskUse=True))
+
+    def get_checkpoint(self, key):
+        """Returns the checkpoint saved under a key as a dictionary, or None if there is none."""
+        return OperationCheckpoint._get_collection().find_one({"_id": key})
+
+    def get_checkpoints(self):
+        """Returns all checkpoints."""
+        return list(OperationCheckpoint._get_collection().find())
+
+    def save_checkpoint(self, key, operation=None, cursor=None, completed=False, started=None):
+        """
+        Saves the progress of an operation under a key.
+
+        Only the progress provided is updated.
+        """
+        progress = {"operation": operation, "cursor": cursor, "started": started}
+        update = {
+            "$set": {
+                **{field: value for field, value in progress.items() if value is not None},
+                "completed": completed,
+                "updated": datetime.now(),
+            }
+        }
+
+        OperationCheckpoint._get_collection().update_one({"_id": key}, update, upsert=True)
+
+    def clear_checkpoint(self, key):
+        """Removes the checkpoint saved under a key."""
+        OperationCheckpoint._get_collection().delete_one({"_id": key})
+
+    def clear_checkpoints(self, prefix=None):
+        """Removes all checkpoints, or those whose key starts with prefix.
+
+        Returns the number of checkpoints removed.
+        """
+        query = {"_id": {"$regex": f"^{re.escape(prefix)}"}} if prefix else {}
+        result = OperationCheckpoint._get_collection().delete_many(query)
+
+        database_logger.info(f"Cleared checkpoints: {result.deleted_count}")
+        return result.deleted_count
@@ -1,5 +1,11 @@
-from .etl import ETLPlaylistOperation, ETLArtistAlbums, ETLAlbumTracks  # noqa: F401
-from .base import StormContext, StormOperation  # noqa: F401
+from .etl import (  # noqa: F401
+    ETLPlaylistOperation,
+    ETLPlaylistArtists,
+    ETLArtistAlbums,
+    ETLArtistEnrichment,
+    ETLAlbumTracks,
+)
+from .base import StormContext, StormOperation, StormJob, StormJobError  # noqa: F401
 
 from storm.utils.logging import etl_logger
 
@@ -20,11 +26,9 @@ class ArtistTrackBuilder(StormOperation):
         """
 
         etl_logger.info(f"Building tracks for {len(self.artists)} artists, releases between {self.start_date} and {self.end_date}.")
-        tracks = []
-
-        for artist in self.artists:
-            artist_tracks = context.storm_db.get_artist_tracks_by_date(artist, self.start_date, self.end_date)
-            tracks.extend(artist_tracks)
+        tracks = context.storm_db.get_artists_tracks_by_date(
+            self.artists, self.start_date, self.end_date
+        )
 
         etl_logger.info(f"{len(tracks)} tracks found")
         return tracks
@@ -1,20 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+
 from storm import StormClient, StormDB  # noqa: F401
+from storm.utils.logging import etl_logger
+
+
+class StormJobError(Exception):
+    """
+    Raised when operations of a job that continues on error have failed.
+
+    Attributes
+    ----------
+    errors : dict
+        The exception raised by each failed operation.
+    skipped : list
+        Operations not run because an operation they depend on failed.
+    """
+
+    def __init__(self, errors, skipped):
+        self.errors = errors
+        self.skipped = skipped
+        super().__init__(
+            f"{len(errors)} operations failed, {len(skipped)} skipped: "
+            + ", ".join(type(operation).__name__ for operation in errors)
+        )
 
 
 class StormJob:
     """
     Chains operations together to form a single job.
+
+    Dependencies between operations are declared with `depends_on`, mapping
+    an operation to the operations that must complete before it starts.
+    Operations whose dependencies are complete run concurrently on up to
+    `max_workers` threads, in the order they were given to the job.
+
+    With `fail_fast` the job stops starting operations after the first failure
+    and raises its error. Otherwise independent operations keep running, the
+    dependents of failed operations are skipped and a StormJobError is raised
+    at the end.
+
+    With a `checkpoint_key`, operations without a key of their own are given
+    one derived from it, and the start of each run is saved under the job's
+    key. A run started within `resume_within` of an interrupted one resumes it:
+    operations that completed are skipped and the others resume from their own
+    checkpoints. Otherwise the earlier run's checkpoints are cleared and the
+    job starts over. Checkpoints are also cleared once the whole job succeeds.
     """
 
-    def __init__(self, *operations):
+    def __init__(
+        self,
+        *operations,
+        depends_on=None,
+        max_workers=1,
+        fail_fast=True,
+        checkpoint_key=None,
+        resume_within=timedelta(hours=12),
+    ):
         self.operations = operations
+        self.depends_on = {
+            operation: list((depends_on or {}).get(operation, [])) for operation in operations
+        }
+        self.max_workers = max_workers
+        self.fail_fast = fail_fast
+        self.checkpoint_key = checkpoint_key
+        self.resume_within = resume_within
+
+        if checkpoint_key:
+            for index, operation in enumerate(operations):
+                if not operation.checkpoint_key:
+                    operation.checkpoint_key = (
+                        f"{checkpoint_key}:{index}:{type(operation).__name__}"
+                    )
+
+        self._validate()
+
+    def _validate(self):
+        """Checks that dependencies are operations of the job and have no cycles."""
+        for operation, dependencies in self.depends_on.items():
+            for dependency in dependencies:
+                if dependency not in self.depends_on:
+                    raise ValueError(
+                        f"{type(operation).__name__} depends on an operation not in the job"
+                    )
+
+        resolved = set()
+        remaining = list(self.operations)
+        while remaining:
+            ready = [
+                op for op in remaining if all(dep in resolved for dep in self.depends_on[op])
+            ]
+            if not ready:
+                raise ValueError("Operation dependencies contain a cycle")
+            resolved.update(ready)
+            remaining = [op for op in remaining if op not in resolved]
 
     def execute(self, context):
         """
         Execute the job.
+
+        Returns the result of each operation, keyed by operation.
         """
+        if self.checkpoint_key:
+            self._start_run(context)
+
+        results = {}
+        errors = {}
+        skipped = []
+        pending = list(self.operations)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for operation in list(pending):
+                    dependencies = self.depends_on[operation]
+                    if any(dep in errors or dep in skipped for dep in dependencies):
+                        etl_logger.warning(
+                            f"Skipping {type(operation).__name__}, a dependency failed"
+                        )
+                        pending.remove(operation)
+                        skipped.append(operation)
+                    elif all(dep in results for dep in dependencies):
+                        pending.remove(operation)
+                        if self.checkpoint_key and operation.is_completed(context):
+                            etl_logger.info(
+                                f"Skipping {type(operation).__name__}, completed in a previous run"
+                            )
+                            results[operation] = None
+                        else:
+                            running[executor.submit(self._run, operation, context)] = operation
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    operation = running.pop(future)
+                    try:
+                        results[operation] = future.result()
+                    except Exception as e:
+                        etl_logger.error(f"{type(operation).__name__} failed: {e}")
+                        errors[operation] = e
+
+                if errors and self.fail_fast:
+                    for future in running:
+                        future.cancel()
+                    wait(running)
+                    raise next(iter(errors.values()))
+
+        if errors:
+            raise StormJobError(errors, skipped)
+
+        if self.checkpoint_key:
+            self._clear_checkpoints(context)
+
+        return results
+
+    def _start_run(self, context):
+        """Resumes a recent interrupted run, or clears the checkpoints of an earlier one."""
+        run = context.storm_db.get_checkpoint(self.checkpoint_key)
+        if run and run.get("started") and run["started"] >= datetime.now() - self.resume_within:
+            etl_logger.info(f"Resuming job {self.checkpoint_key} started at: {run['started']}")
+            return
+
+        self._clear_checkpoints(context)
+        context.storm_db.save_checkpoint(
+            self.checkpoint_key, operation=type(self).__name__, started=datetime.now()
+        )
+
+    def _clear_checkpoints(self, context):
+        """Removes the checkpoints of the job and its operations."""
         for operation in self.operations:
-            operation.execute(context)
+            operation.clear_checkpoint(context)
+        context.storm_db.clear_checkpoint(self.checkpoint_key)
+
+    def _run(self, operation, context):
+        """Executes an operation, marking it as completed in a checkpointed job."""
+        result = operation.execute(context)
+        if self.checkpoint_key:
+            operation.complete_checkpoint(context)
+        return result
 
 
 class StormContext:
@@ -30,10 +195,67 @@ class StormContext:
 class StormOperation:
     """
     Base class for operations.
+
+    Operations with a checkpoint_key save their progress to the database and
+    resume from it when run again after being interrupted.
     """
 
+    checkpoint_key = None
+
     def execute(self, context):
         """
         Execute the operation.
         """
         raise NotImplementedError
+
+    def load_checkpoint(self, context):
+        """
+        Returns the progress saved by an interrupted run, or an empty dictionary.
+
+        The checkpoint of a completed run is cleared so the operation starts over.
+        """
+        if not self.checkpoint_key:
+            return {}
+
+        checkpoint = context.storm_db.get_checkpoint(self.checkpoint_key)
+        if not checkpoint:
+            return {}
+
+        if checkpoint.get("completed"):
+            self.clear_checkpoint(context)
+            return {}
+
+        etl_logger.info(f"Resuming {type(self).__name__} from checkpoint: {self.checkpoint_key}")
+        return checkpoint
+
+    def save_checkpoint(self, context, **progress):
+        """
+        Save the progress of the operation, see StormDB.save_checkpoint.
+        """
+        if self.checkpoint_key:
+            context.storm_db.save_checkpoint(
+                self.checkpoint_key, operation=type(self).__name__, **progress
+            )
+
+    def complete_checkpoint(self, context):
+        """
+        Mark the operation as completed.
+        """
+        self.save_checkpoint(context, completed=True)
+
+    def clear_checkpoint(self, context):
+        """
+        Remove the saved progress of the operation.
+        """
+        if self.checkpoint_key:
+            context.storm_db.clear_checkpoint(self.checkpoint_key)
+
+    def is_completed(self, context):
+        """
+        Returns True if the operation has a checkpoint from a completed run.
+        """
+        if not self.checkpoint_key:
+            return False
+
+        checkpoint = context.storm_db.get_checkpoint(self.checkpoint_key)
+        return bool(checkpoint and checkpoint.get("completed"))
@@ -1,51 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from .base import StormOperation, StormContext
+from storm.objects import PlaylistTrack
 from storm.utils.logging import etl_logger
+from storm.utils.batching import chunked
+from storm.utils.pipeline import run_pipeline, CompletionCursor
 
 
 class ETLPlaylistOperation(StormOperation):
     """
     Extracts data from Spotify and loads it into the database.
+
+    In incremental mode playlists whose snapshot_id matches the stored one are
+    skipped, and only added and removed tracks are written for the rest.
+
+    With a checkpoint_key, the last playlist synchronized is saved as a cursor
+    and an interrupted run resumes with the playlist after it.
     """
 
-    def __init__(self, playlist_ids):
+    def __init__(self, playlist_ids, incremental=False, checkpoint_key=None):
         self.playlist_ids = playlist_ids
+        self.incremental = incremental
+        self.checkpoint_key = checkpoint_key
 
     def execute(self, context):
         """
         Execute the operation.
         """
+        playlist_ids = list(self.playlist_ids)
+        cursor = self.load_checkpoint(context).get("cursor")
+        if cursor in playlist_ids:
+            playlist_ids = playlist_ids[playlist_ids.index(cursor) + 1:]
 
-        for playlist_id in self.playlist_ids:
+        for playlist_id in playlist_ids:
             self.extract_load_playlist(context, playlist_id)
+            self.save_checkpoint(context, cursor=playlist_id)
+
+        self.clear_checkpoint(context)
 
     def extract_load_playlist(self, context, playlist_id):
         # Extract data from Spotify
 
         etl_logger.info(f"Extracting data from Spotify: {playlist_id}")
         playlist = context.storm_client.get_playlist_metadata(playlist_id)
+
+        if self.incremental:
+            stored_snapshot_id = context.storm_db.get_playlist_snapshot_id(playlist_id)
+            if stored_snapshot_id and stored_snapshot_id == playlist["snapshot_id"]:
+                etl_logger.info(
+                    "Playlist unchanged since last sync, skipping: "
+                    f"{playlist_id}, {playlist['name']}"
+                )
+                return
+
         tracks = context.storm_client.get_playlist_tracks(playlist_id)
 
         etl_logger.info(f"Extracted {len(tracks)} tracks from Spotify")
         etl_logger.info(f"Synchronizing data with database...")
 
+        if self.incremental:
+            self.load_playlist_changes(context, playlist_id, tracks)
+        else:
+            context.storm_db.update_playlist_tracks(
+                playlist_id, tracks, flag_deleted=True, bulk=True
+            )
+
+        # Stored last so a failed sync is retried on the next incremental run
         context.storm_db.update_playlist(playlist)
-        context.storm_db.update_playlist_tracks(playlist_id, tracks, flag_deleted=True)
 
         etl_logger.info(
             f"Data synchronized with database for playlist: {playlist_id}, {playlist['name']}"
         )
 
+    def load_playlist_changes(self, context, playlist_id, tracks):
+        """Writes only the tracks added to and removed from a playlist."""
+        stored_ids = context.storm_db.get_playlist_track_ids(playlist_id)
+
+        live_ids = set()
+        added = []
+        for track in tracks:
+            if not track.get("track") or not track["track"].get("id"):
+                continue
+
+            playlist_track_id = PlaylistTrack.make_id(track["track"]["id"], playlist_id)
+            live_ids.add(playlist_track_id)
+            if playlist_track_id not in stored_ids:
+                added.append(track)
+
+        removed = stored_ids - live_ids
+
+        if added:
+            context.storm_db.update_playlist_tracks(playlist_id, added, bulk=True)
+        if removed:
+            context.storm_db.soft_delete_playlist_tracks(playlist_id, ids=removed)
+
+        etl_logger.info(
+            f"Applied playlist changes for {playlist_id}: "
+            f"{len(added)} added, {len(removed)} removed"
+        )
+
+
+class ETLPlaylistArtists(StormOperation):
+    """
+    Creates artists from the tracks of playlists in the database.
+    """
+
+    def __init__(self, playlist_ids):
+        self.playlist_ids = playlist_ids
+
+    def execute(self, context):
+        """
+        Execute the operation.
+        """
+
+        for playlist_id in self.playlist_ids:
+            context.storm_db.update_artists_from_playlist_tracks(playlist_id)
+
 
 class ETLArtistAlbums(StormOperation):
     """
     Extracts all of an artists albums from Spotify and loads them into the database.
 
     Currently filters on the update date for the artists.
+
+    In incremental mode only albums missing from the database are fetched,
+    artists whose discography is unchanged cost a single page per album group.
+
+    Artists can also be given as playlist_ids, in which case the artists of
+    those playlists are read from the database when the operation runs.
+
+    Discographies are fetched on up to max_workers threads and each is written
+    to the database as soon as it arrives. With a checkpoint_key, the artist
+    up to which every discography was handled is saved as a cursor, and an
+    interrupted run resumes after it.
     """
 
-    def __init__(self, artists, album_start_date):
+    def __init__(
+        self,
+        artists,
+        album_start_date,
+        incremental=False,
+        playlist_ids=None,
+        max_workers=8,
+        checkpoint_key=None,
+    ):
         self.artists = artists
         self.album_start_date = album_start_date
+        self.incremental = incremental
+        self.playlist_ids = playlist_ids
+        self.max_workers = max_workers
+        self.checkpoint_key = checkpoint_key
+
+    def fetch_albums(self, context, artist):
+        """
+        Fetch the albums of an artist, returns the albums and album totals.
+        """
+        if self.incremental:
+            known_album_ids = context.storm_db.get_artist_album_ids(artist["_id"])
+            return context.storm_client.get_new_artist_albums(
+                artist["_id"], known_album_ids, artist.get("album_totals")
+            )
+
+        return context.storm_client.get_artist_albums(artist["_id"]), None
 
     def execute(self, context):
         """
@@ -56,32 +172,156 @@ class ETLArtistAlbums(StormOperation):
             f"Extracting data from Spotify for artist albums updated between: {self.album_start_date}"
         )
 
+        if self.artists is None:
+            self.artists = list({
+                artist_id
+                for playlist_id in self.playlist_ids
+                for artist_id in context.storm_db.get_playlist_artists(playlist_id)
+            })
+
+        last_id = self.load_checkpoint(context).get("cursor")
+
         # intersection of artists specified and artists in the database
-        artists_to_collect = context.storm_db.get_artists_for_album_collection(
-            self.album_start_date
+        artists = context.storm_db.get_artists_for_album_collection(
+            self.album_start_date,
+            fields=["_id", "name", "album_totals"],
+            artist_ids=[
+                artist_id for artist_id in self.artists if last_id is None or artist_id > last_id
+            ],
         )
-        artists = [artist for artist in artists_to_collect if artist["_id"] in self.artists]
-        
-        for artist in artists:
-            albums = context.storm_client.get_artist_albums(artist["_id"])
-            context.storm_db.update_albums_from_artist_albums(artist, albums)
+        artists = sorted(artists, key=lambda artist: artist["_id"])
 
-            etl_logger.info(
-                f"Extracted {len(albums)} albums for artist: {artist['_id']}, {artist['name']}"
-            )
+        cursor = CompletionCursor()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for artist in artists:
+                cursor.issue(artist["_id"])
+                futures[executor.submit(self.fetch_albums, context, artist)] = artist
+
+            try:
+                for future in as_completed(futures):
+                    artist = futures[future]
+                    try:
+                        albums, album_totals = future.result()
+                    except Exception as e:
+                        # Left unrefreshed, the artist is picked up again by the next run
+                        etl_logger.error(f"Error getting albums for artist: {artist['_id']}, {e}")
+                    else:
+                        context.storm_db.update_albums_from_artist_albums(
+                            artist, albums, album_totals
+                        )
+                        etl_logger.info(
+                            f"Extracted {len(albums)} {'new ' if self.incremental else ''}albums "
+                            f"for artist: {artist['_id']}, {artist['name']}"
+                        )
+
+                    position = cursor.complete(artist["_id"])
+                    if position:
+                        self.save_checkpoint(context, cursor=position)
+            except BaseException:
+                # Don't spend requests on fetches whose results can no longer be written
+                executor.shutdown(cancel_futures=True)
+                raise
+
+        self.clear_checkpoint(context)
 
         etl_logger.info(
             f"Data synchronized with database for artist albums updated prior to: {self.album_start_date}"
         )
 
 
+class ETLArtistEnrichment(StormOperation):
+    """
+    Fills in full metadata (genres, popularity, followers, images) for artists
+    created from the simplified artist objects embedded in tracks.
+    """
+
+    def __init__(self, stale_before=None, batch_size=1000):
+        self.stale_before = stale_before
+        self.batch_size = batch_size
+
+    def execute(self, context):
+        """
+        Execute the operation.
+        """
+
+        etl_logger.info(
+            "Extracting artist metadata from Spotify for artists missing metadata "
+            f"or updated prior to: {self.stale_before}"
+        )
+
+        # Read the IDs up front, enriched artists stop matching the query
+        artist_ids = [
+            artist["_id"]
+            for artist in context.storm_db.get_artists_for_enrichment(
+                self.stale_before, fields=["_id"]
+            )
+        ]
+
+        for batch in chunked(artist_ids, self.batch_size):
+            artists, missing = context.storm_client.get_several_artists(batch)
+            context.storm_db.update_artists_metadata(artists)
+            context.storm_db.update_artists_metadata_missing(missing)
+
+            etl_logger.info(f"Extracted metadata for {len(artists)} of {len(batch)} artists")
+
+        etl_logger.info(f"Data synchronized with database for {len(artist_ids)} artists")
+
+
 class ETLAlbumTracks(StormOperation):
     """
     Extracts all of an albums tracks from Spotify and loads them into the database.
+
+    Albums are hydrated in batches through the several albums endpoint.
+
+    Runs as a streaming pipeline: album IDs are read from the database in pages
+    of read_batch_size, batches are fetched from Spotify on `workers` threads
+    and each fetched batch is written with a bulk upsert. Stages are connected
+    by bounded queues so memory stays flat on large backfills.
+
+    With a checkpoint_key, the last album ID written in order is saved as a
+    cursor and an interrupted backfill resumes after it.
     """
 
-    def __init__(self, album_last_collected_date=None):
+    def __init__(
+        self,
+        album_last_collected_date=None,
+        batch_size=20,
+        workers=4,
+        read_batch_size=1000,
+        queue_size=8,
+        checkpoint_key=None,
+    ):
         self.album_last_collected_date = album_last_collected_date
+        self.batch_size = batch_size
+        self.workers = workers
+        self.read_batch_size = read_batch_size
+        self.queue_size = queue_size
+        self.checkpoint_key = checkpoint_key
+
+    def read_albums(self, context, last_id=None, cursor=None):
+        """
+        Yield batches of albums to collect, paging through the database by ID
+        from after last_id. The last ID of each batch is issued to cursor.
+        """
+        while True:
+            albums = list(
+                context.storm_db.get_albums_for_track_collection(
+                    self.album_last_collected_date,
+                    only_return_missing=True,
+                    fields=["_id", "name"],
+                    after_id=last_id,
+                    limit=self.read_batch_size,
+                )
+            )
+            if not albums:
+                return
+
+            last_id = albums[-1]["_id"]
+            for batch in chunked(albums, self.batch_size):
+                if cursor is not None:
+                    cursor.issue(batch[-1]["_id"])
+                yield batch
 
     def execute(self, context):
         """
@@ -92,21 +332,36 @@ class ETLAlbumTracks(StormOperation):
             f"Extracting data from Spotify for album tracks not updated since prior to: {self.album_last_collected_date}"
         )
 
-        albums = context.storm_db.get_albums_for_track_collection(
-            self.album_last_collected_date, only_return_missing=True
-        )
-        for album in albums:
-            tracks = context.storm_client.get_album_tracks(album["_id"])
+        def fetch(batch):
+            # Albums of failed requests are left out and retried by the next run
+            return context.storm_client.get_several_album_tracks(
+                [album["_id"] for album in batch]
+            )
 
-            if len(tracks) > 0:
-                context.storm_db.update_tracks_from_album_tracks(album["_id"], tracks)
-                etl_logger.info(
-                    f"Extracted {len(tracks)} tracks for album: {album['_id']}, {album['name']}"
-                )
+        # Batches are written out of order, the cursor only advances past
+        # batches whose predecessors have all been written
+        cursor = CompletionCursor()
 
-            else:
-                context.storm_db.update_album_track_collection_fail(album["_id"])
+        def write(batch, album_tracks):
+            collected, failed = context.storm_db.update_tracks_from_several_album_tracks(
+                album_tracks
+            )
+            etl_logger.info(
+                f"Extracted tracks for {len(collected)} albums, {len(failed)} failed"
+            )
+
+            position = cursor.complete(batch[-1]["_id"])
+            if position:
+                self.save_checkpoint(context, cursor=position)
+
+        last_id = self.load_checkpoint(context).get("cursor")
+        batches = run_pipeline(
+            self.read_albums(context, last_id, cursor), fetch, write, self.workers, self.queue_size
+        )
+        etl_logger.info(f"Processed {batches} album batches")
+
+        self.clear_checkpoint(context)
 
         etl_logger.info(
             f"Data synchronized with database for album tracks updated prior to: {self.album_last_collected_date}"
-        )
\ No newline at end of file
+        )
@@ -2,4 +2,5 @@ from .storm_config import StormConfig  # noqa: F401
 from .playlist import Playlist, PlaylistTrack  # noqa: F401
 from .track import Track  # noqa: F401
 from .artist import Artist, ArtistBlacklist  # noqa: F401
-from .album import Album  # noqa: F401
+from .album import Album, parse_release_date  # noqa: F401
+from .checkpoint import OperationCheckpoint  # noqa: F401
@@ -10,6 +10,30 @@ from mongoengine import (
 from datetime import datetime
 
 
+RELEASE_DATE_FORMATS = {"year": "%Y", "month": "%Y-%m", "day": "%Y-%m-%d"}
+
+
+def parse_release_date(release_date, release_date_precision=None):
+    """
+    Parses a Spotify release date into a datetime.
+
+    Year and month precision dates resolve to the first day of the period.
+    Returns None if the date is missing or cannot be parsed.
+    """
+    if not release_date:
+        return None
+
+    date_format = RELEASE_DATE_FORMATS.get(release_date_precision)
+    if date_format is None:
+        # Infer the precision from the number of date parts
+        date_format = list(RELEASE_DATE_FORMATS.values())[min(release_date.count("-"), 2)]
+
+    try:
+        return datetime.strptime(release_date, date_format)
+    except ValueError:
+        return None
+
+
 class Album(Document):
     """
     A class used to represent an album in the database.
@@ -22,6 +46,10 @@ class Album(Document):
         The artists of the album.
     release_date : StringField
         The release date of the album.
+    release_datetime : DateTimeField
+        The release date normalized to a datetime, used for date range queries.
+    next_track_collection_attempt : DateTimeField
+        The earliest date track collection is retried after a failure.
     """
 
     album_type = StringField()
@@ -34,6 +62,7 @@ class Album(Document):
     name = StringField(required=True)
     release_date = StringField()
     release_date_precision = StringField()
+    release_datetime = DateTimeField()
     restrictions = DictField()
     type = StringField()
     uri = StringField()
@@ -42,8 +71,17 @@ class Album(Document):
     last_updated = DateTimeField()
     tracks_collected_date = DateTimeField()
     track_collection_fail_count = IntField()
+    next_track_collection_attempt = DateTimeField()
 
-    meta = {"collection": "album"}
+    meta = {
+        "collection": "album",
+        "indexes": [
+            {"fields": ["artists.id", "release_datetime"]},
+            "release_datetime",
+            "tracks_collected_date",
+            "next_track_collection_attempt",
+        ],
+    }
 
     def from_json(json):
         """Creates an Album object from a JSON object."""
@@ -65,6 +103,9 @@ class Album(Document):
                 if "release_date_precision" in json
                 else None
             ),
+            release_datetime=parse_release_date(
+                json.get("release_date"), json.get("release_date_precision")
+            ),
             restrictions=json["restrictions"] if "restrictions" in json else {},
             type=json["type"] if "type" in json else None,
             uri=json["uri"] if "uri" in json else None,
@@ -4,6 +4,7 @@ from mongoengine import (
     DictField,
     ListField,
     IntField,
+    BooleanField,
     DateTimeField,
 )
 
@@ -22,6 +23,12 @@ class Artist(Document):
         The genres of the artist.
     popularity : IntField
         The popularity of the artist.
+    metadata_updated : DateTimeField
+        When full metadata was last collected from the artists endpoint.
+    metadata_missing : BooleanField
+        Whether Spotify returned no artist at the last metadata collection.
+    album_totals : DictField
+        The album count Spotify reported per album group at the last refresh.
     """
 
     name = StringField(required=True)
@@ -35,8 +42,11 @@ class Artist(Document):
     type = StringField()
     last_updated = DateTimeField()
     last_album_update = DateTimeField()
+    metadata_updated = DateTimeField()
+    metadata_missing = BooleanField()
+    album_totals = DictField()
 
-    meta = {"collection": "artist"}
+    meta = {"collection": "artist", "indexes": ["last_album_update", "metadata_updated"]}
 
     def from_json(json):
         """Creates an Artist object from a JSON object."""
@@ -73,4 +83,4 @@ class ArtistBlacklist(Document):
     storm_name = StringField(required=True)
     blacklist_type = StringField()
 
-    meta = {"collection": "artist_blacklist"}
\ No newline at end of file
+    meta = {"collection": "artist_blacklist", "indexes": ["storm_name"]}
\ No newline at end of file
@@ -0,0 +1,36 @@
+from mongoengine import (
+    Document,
+    StringField,
+    BooleanField,
+    DateTimeField,
+)
+
+
+class OperationCheckpoint(Document):
+    """
+    A class used to represent the progress of an operation in the database.
+
+    Attributes
+    ----------
+    _id : StringField
+        The checkpoint key of the operation, is a unique identifier.
+    operation : StringField
+        The class name of the operation.
+    cursor : StringField
+        The last ID the operation processed, it resumes after it.
+    completed : BooleanField
+        Whether the operation ran to completion.
+    started : DateTimeField
+        When the run of a job that wrote the checkpoint started.
+    updated : DateTimeField
+        The date the checkpoint was last saved.
+    """
+
+    _id = StringField(required=True, primary_key=True)
+    operation = StringField()
+    cursor = StringField()
+    completed = BooleanField(default=False)
+    started = DateTimeField()
+    updated = DateTimeField()
+
+    meta = {"collection": "operation_checkpoint"}
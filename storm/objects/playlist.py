@@ -85,12 +85,15 @@ class PlaylistTrack(Document):
     sys_last_updated = DateTimeField()
     sys_is_deleted = BooleanField(default=False)
 
-    meta = {"collection": "playlist_track"}
+    meta = {
+        "collection": "playlist_track",
+        "indexes": [{"fields": ["playlist_id", "sys_is_deleted"]}],
+    }
 
     def from_json(json):
         """Creates a PlaylistTrack object from a JSON object."""
         return PlaylistTrack(
-            _id=json["track"]["id"] + json["playlist_id"],
+            _id=PlaylistTrack.make_id(json["track"]["id"], json["playlist_id"]),
             playlist_id=json["playlist_id"],
             track=json["track"],
             track_id=json["track"]["id"],
@@ -100,6 +103,10 @@ class PlaylistTrack(Document):
             sys_last_updated=datetime.now(),
         )
 
+    def make_id(track_id, playlist_id):
+        """Builds the ID of a playlist item from its track and playlist IDs."""
+        return track_id + playlist_id
+
     def save(self):
         """Saves the playlist item to the database."""
         super().save()
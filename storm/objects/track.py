@@ -43,7 +43,7 @@ class Track(Document):
     _id = StringField(required=True, primary_key=True)
     last_updated = DateTimeField()
 
-    meta = {"collection": "track"}
+    meta = {"collection": "track", "indexes": ["artists.id", "album.id"]}
 
     def from_json(json):
         """Creates a Track object from a JSON object."""
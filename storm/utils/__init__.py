@@ -1 +1,2 @@
 from .logging import database_logger, client_logger, etl_logger  # noqa: F401
+from .batching import chunked  # noqa: F401
@@ -0,0 +1,173 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Seconds responses stay fresh per endpoint, playlists change between runs so
+# they are never cached
+DEFAULT_TTLS = {
+    "albums": 7 * 24 * 3600,
+    "albums/tracks": 7 * 24 * 3600,
+    "artists": 24 * 3600,
+    "artists/albums": 24 * 3600,
+    "playlists": 0,
+    "playlists/tracks": 0,
+}
+
+
+class ResponseCache:
+    """
+    An on-disk cache of API responses backed by SQLite.
+
+    Responses are keyed by URL and parameters and stay fresh for a TTL set
+    per endpoint. Expired responses that carried an ETag are kept so they can
+    be revalidated with If-None-Match. Once the cache grows past `max_bytes`
+    the least recently used responses are evicted.
+    """
+
+    def __init__(self, path=".storm_cache.sqlite", ttls=None, default_ttl=24 * 3600,
+                 max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                body TEXT,
+                etag TEXT,
+                expires_at REAL,
+                accessed_at REAL,
+                size INTEGER
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._connection.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def key(self, url, params=None):
+        """Builds the cache key of a request from its URL and parameters."""
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        return f"{url}?{json.dumps(params, sort_keys=True, default=str)}"
+
+    def ttl(self, endpoint):
+        """Returns the TTL in seconds for an endpoint, 0 means it is not cached."""
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, key):
+        """
+        Returns the cached (body, etag, is_fresh) for a key, or None if it is not
+        cached. Stale responses without an ETag count as misses.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, etag, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            body, etag, expires_at = row
+            is_fresh = expires_at > time.time()
+            if not is_fresh and not etag:
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._connection.commit()
+            if is_fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+            return json.loads(body), etag, is_fresh
+
+    def set(self, key, endpoint, body, etag=None):
+        """Stores a response and evicts least recently used ones over the size cap."""
+        serialized = json.dumps(body)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, serialized, etag, now + self.ttl(endpoint), now, len(serialized)),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def refresh(self, key, endpoint):
+        """Marks a revalidated response as fresh for another TTL."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                (now + self.ttl(endpoint), now, key),
+            )
+            self._connection.commit()
+            self.revalidations += 1
+
+    def clear(self):
+        """Removes all cached responses."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def size(self):
+        """Returns the total size of the cached responses in bytes."""
+        with self._lock:
+            return self._size()
+
+    def stats(self):
+        """
+        Returns hit, miss and eviction counts. Stale lookups are responses that
+        were revalidated with the server, revalidations are those confirmed
+        unchanged.
+        """
+        with self._lock:
+            requests = self.hits + self.misses + self.stale
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.revalidations) / requests if requests else 0.0,
+                "size_bytes": self._size(),
+            }
+
+    def _size(self):
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def _evict(self):
+        """Deletes least recently used responses until the cache fits max_bytes."""
+        excess = self._size() - self.max_bytes
+        if excess <= 0:
+            return
+
+        evicted = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
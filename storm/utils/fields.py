@@ -0,0 +1,42 @@
+# Field profiles control how much of each Spotify object is requested and kept.
+# "playlist_items" is passed as the fields parameter of the playlist items
+# endpoint, "drop" lists keys removed locally from endpoints without one.
+FIELD_PROFILES = {
+    "full": {
+        "playlist_items": None,
+        "drop": frozenset(),
+    },
+    "storm": {
+        "playlist_items": (
+            "items(added_at,added_by(id,type),is_local,"
+            "track(id,name,type,uri,duration_ms,explicit,popularity,disc_number,track_number,"
+            "artists(id,name,type,uri),"
+            "album(id,name,album_type,total_tracks,release_date,release_date_precision,type,uri,"
+            "artists(id,name,type,uri)))),"
+            "total,limit,offset,next"
+        ),
+        "drop": frozenset(
+            {
+                "available_markets",
+                "external_ids",
+                "external_urls",
+                "href",
+                "images",
+                "linked_from",
+                "preview_url",
+                "restrictions",
+            }
+        ),
+    },
+}
+
+
+def strip_fields(value, drop):
+    """Returns a copy of a JSON value with the keys in `drop` removed at every level."""
+    if not drop:
+        return value
+    if isinstance(value, dict):
+        return {key: strip_fields(item, drop) for key, item in value.items() if key not in drop}
+    if isinstance(value, list):
+        return [strip_fields(item, drop) for item in value]
+    return value
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch_all_pages(first_page, fetch_page, max_workers=8, next_page=None):
+    """
+    Returns the items of every page of a Spotify paging object, in order.
+
+    The total and limit reported by the first page determine the remaining
+    offsets, which are fetched concurrently with `fetch_page(offset, limit)`
+    using at most `max_workers` requests in flight. Pages without a reported
+    total are followed one at a time with `next_page(page)` instead.
+    """
+    items = list(first_page["items"])
+
+    if first_page.get("total") is None or not first_page.get("limit"):
+        page = next_page(first_page) if next_page and first_page.get("next") else None
+        while page:
+            items.extend(page["items"])
+            page = next_page(page) if page.get("next") else None
+        return items
+
+    limit = first_page["limit"]
+    offsets = range(first_page.get("offset", 0) + limit, first_page["total"], limit)
+    if not offsets:
+        return items
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(offsets))) as executor:
+        for page in executor.map(lambda offset: fetch_page(offset, limit), offsets):
+            items.extend(page["items"])
+
+    return items
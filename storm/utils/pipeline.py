@@ -0,0 +1,125 @@
+from collections import deque
+from queue import Queue, Empty, Full
+import threading
+
+_DONE = object()
+
+
+def run_pipeline(source, process, sink, workers=4, queue_size=8):
+    """
+    Streams items from `source` through `process` into `sink`, returns the number of items written.
+
+    The source is iterated on a reader thread, `process(item)` runs on `workers`
+    threads and `sink(item, result)` runs on the calling thread, in completion
+    order. Stages are connected by queues holding at most `queue_size` items, so
+    a slow sink holds back the readers rather than buffering without bound. The
+    first exception raised by any stage stops the pipeline and is re-raised.
+    """
+    inputs = Queue(queue_size)
+    outputs = Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def put(queue, item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get(queue):
+        while not stop.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                continue
+        return _DONE
+
+    def fail(error):
+        errors.append(error)
+        stop.set()
+
+    def read():
+        try:
+            for item in source:
+                if not put(inputs, item):
+                    return
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in range(workers):
+                put(inputs, _DONE)
+
+    def work():
+        try:
+            while True:
+                item = get(inputs)
+                if item is _DONE or not put(outputs, (item, process(item))):
+                    return
+        except Exception as e:
+            fail(e)
+        finally:
+            put(outputs, _DONE)
+
+    threads = [threading.Thread(target=read, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    written = 0
+    finished = 0
+    try:
+        while finished < workers:
+            result = get(outputs)
+            if result is _DONE:
+                if stop.is_set():
+                    break
+                finished += 1
+                continue
+
+            sink(*result)
+            written += 1
+    except Exception as e:
+        fail(e)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return written
+
+
+class CompletionCursor:
+    """
+    Tracks how far through an ordered sequence of IDs work has completed,
+    when items complete out of order.
+
+    The position only advances past an ID once it and every ID issued before
+    it have completed, so resuming after the position never skips work.
+    """
+
+    def __init__(self):
+        self.issued = deque()
+        self.completed = set()
+        self.position = None
+
+    def issue(self, item_id):
+        """Records the next ID of the sequence."""
+        self.issued.append(item_id)
+
+    def complete(self, item_id):
+        """Marks an ID as completed, returns the new position if it advanced, otherwise None."""
+        self.completed.add(item_id)
+
+        advanced = False
+        while self.issued and self.issued[0] in self.completed:
+            self.position = self.issued.popleft()
+            self.completed.discard(self.position)
+            advanced = True
+
+        return self.position if advanced else None
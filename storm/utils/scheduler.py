@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import defaultdict
+
+from .logging import client_logger
+
+
+class RequestScheduler:
+    """
+    Paces API requests through a shared token bucket and retries throttled ones.
+
+    Every request takes a token from a bucket refilled at `rate` tokens per
+    second, holding at most `burst` tokens. A throttled (429) response pauses
+    all requests for the server's Retry-After, and the endpoint that was
+    throttled backs off exponentially until it succeeds again.
+    """
+
+    def __init__(
+        self,
+        rate=10.0,
+        burst=20,
+        max_retries=5,
+        default_retry_after=1.0,
+        base_backoff=1.0,
+        max_backoff=60.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._endpoint_paused_until = defaultdict(float)
+        self._endpoint_throttle_streak = defaultdict(int)
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttle_events = 0
+        self.endpoint_throttle_events = defaultdict(int)
+        self.queue_wait_seconds = 0.0
+
+    def call(self, endpoint, request, *args, **kwargs):
+        """
+        Sends a request once the scheduler allows it, retrying on throttling.
+
+        The error is raised once a request has been throttled more than
+        `max_retries` times or fails for any other reason.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._acquire(endpoint)
+            try:
+                result = request(*args, **kwargs)
+            except Exception as e:
+                if getattr(e, "http_status", None) != 429 or attempt == self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                self._throttle(endpoint, self._retry_after(e))
+                continue
+
+            with self._lock:
+                self._endpoint_throttle_streak[endpoint] = 0
+            return result
+
+    def stats(self):
+        """Returns request, throttle and queue wait counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttle_events": self.throttle_events,
+                "endpoint_throttle_events": dict(self.endpoint_throttle_events),
+                "queue_wait_seconds": self.queue_wait_seconds,
+            }
+
+    def _acquire(self, endpoint):
+        """Blocks until the endpoint is not paused and a token is available."""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._refilled_at) * self.rate
+                )
+                self._refilled_at = now
+
+                wait = max(self._paused_until, self._endpoint_paused_until[endpoint]) - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.requests += 1
+                        self.queue_wait_seconds += now - started
+                        return
+                    wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+    def _throttle(self, endpoint, retry_after):
+        """Pauses all requests for retry_after, and the endpoint for its backoff."""
+        with self._lock:
+            now = time.monotonic()
+            self._endpoint_throttle_streak[endpoint] += 1
+            backoff = min(
+                self.max_backoff,
+                self.base_backoff * 2 ** (self._endpoint_throttle_streak[endpoint] - 1),
+            )
+
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self._endpoint_paused_until[endpoint] = max(
+                self._endpoint_paused_until[endpoint], now + max(retry_after, backoff)
+            )
+
+            self.throttle_events += 1
+            self.retries += 1
+            self.endpoint_throttle_events[endpoint] += 1
+
+        client_logger.warning(
+            f"Throttled on {endpoint}, retrying after {max(retry_after, backoff):.1f}s"
+        )
+
+    def _retry_after(self, error):
+        """Reads the Retry-After header of a throttled response, in seconds."""
+        headers = getattr(error, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", self.default_retry_after))
+        except (TypeError, ValueError):
+            return self.default_retry_after
@@ -1,12 +1,27 @@
 from invoke import task
-from storm.jobs import ETLPlaylistOperation, ETLArtistAlbums, ETLAlbumTracks, ArtistTrackBuilder
+from storm.jobs import (
+    ETLPlaylistOperation, ETLPlaylistArtists, ETLArtistAlbums, ETLArtistEnrichment, ETLAlbumTracks,
+    ArtistTrackBuilder, StormJob,
+)
 from storm import StormClient, StormDB, StormUserClient
+from storm.utils.cache import ResponseCache
 from storm.jobs.base import StormContext
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 import os
 import pandas as pd
 
+def storm_client():
+    """ StormClient with the response cache enabled if STORM_RESPONSE_CACHE is set"""
+    cache_path = os.getenv("STORM_RESPONSE_CACHE")
+    return StormClient(cache=ResponseCache(cache_path) if cache_path else None)
+
+@lru_cache(maxsize=None)
+def storm_user_client(user_id):
+    """ StormUserClient shared across tasks, so its playlist index is reused"""
+    return StormUserClient(user_id)
+
 @task
 def test(c, format=True, lint=True):
     """ Runs a full test suite"""
@@ -29,15 +44,15 @@ def format(c):
 @task
 def run_playlist_etl(c):
     """ Runs the playlist ETL job"""
-    context = StormContext(StormClient(), StormDB())
+    context = StormContext(storm_client(), StormDB.shared())
     instrumental_safety = "0R1gw1JbcOFD0r8IzrbtYP"
     lyrical_safety = "2zngrEiplX6Z1aAaIWgZ4m"
-    ETLPlaylistOperation([instrumental_safety, lyrical_safety]).execute(context)
+    ETLPlaylistOperation([instrumental_safety, lyrical_safety], incremental=True).execute(context)
 
 @task
 def extract_artists_from_tracks(c, playlist_id):
     """ Extracts artists from tracks in the database"""
-    db = StormDB()
+    db = StormDB.shared()
     db.update_artists_from_playlist_tracks(playlist_id)
 
     return db.get_playlist_artists(playlist_id)
@@ -45,31 +60,94 @@ def extract_artists_from_tracks(c, playlist_id):
 @task
 def extract_weekly_artist_albums(c, artists):
     """ Extracts artist albums from Spotify"""
-    context = StormContext(StormClient(), StormDB())
+    context = StormContext(storm_client(), StormDB.shared())
     start_date = datetime.now() - timedelta(days=7)
-    ETLArtistAlbums(artists, start_date).execute(context)
+    ETLArtistAlbums(artists, start_date, incremental=True).execute(context)
+
+@task
+def enrich_artists(c, stale_days=30):
+    """ Fills in full artist metadata from Spotify"""
+    context = StormContext(storm_client(), StormDB.shared())
+    stale_before = datetime.now() - timedelta(days=int(stale_days))
+    ETLArtistEnrichment(stale_before).execute(context)
 
 @task
 def extract_missing_album_tracks(c):
     """ Extracts missing album tracks from Spotify"""
-    context = StormContext(StormClient(), StormDB())
-    ETLAlbumTracks().execute(context)
+    context = StormContext(storm_client(), StormDB.shared())
+    ETLAlbumTracks(checkpoint_key="album_tracks").execute(context)
 
 @task
-def run_full_etl(c):
-    """ Runs the full ETL job"""
+def report_quarantined_albums(c):
+    """ Reports albums that stopped being retried after repeated track collection failures"""
+    albums = StormDB.shared().get_quarantined_albums(
+        fields=["_id", "name", "track_collection_fail_count"]
+    )
+    for album in albums:
+        print(f"{album['_id']}: {album.get('name')} ({album['track_collection_fail_count']} failures)")
+    print(f"{len(albums)} quarantined albums")
 
-    instrumental_safety = "0R1gw1JbcOFD0r8IzrbtYP"
-    lyrical_safety = "2zngrEiplX6Z1aAaIWgZ4m"
+@task
+def show_checkpoints(c):
+    """ Shows the saved progress of interrupted operations"""
+    for checkpoint in StormDB.shared().get_checkpoints():
+        status = "completed" if checkpoint.get("completed") else "in progress"
+        progress = ", ".join(
+            f"{field}: {checkpoint[field]}"
+            for field in ["cursor", "started"]
+            if checkpoint.get(field) is not None
+        )
+        print(f"{checkpoint['_id']} ({checkpoint.get('operation')}, {status}, "
+              f"updated {checkpoint.get('updated')}) {progress}")
 
-    run_playlist_etl(c)
-    inst_artists = extract_artists_from_tracks(c, instrumental_safety)
-    lyr_artists = extract_artists_from_tracks(c, lyrical_safety)
+@task
+def clear_checkpoints(c, prefix=None):
+    """ Clears saved checkpoints, all of them or those whose key starts with prefix"""
+    cleared = StormDB.shared().clear_checkpoints(prefix)
+    print(f"Cleared {cleared} checkpoints")
 
-    extract_weekly_artist_albums(c, inst_artists)
-    extract_weekly_artist_albums(c, lyr_artists)
+@task
+def ensure_indexes(c):
+    """ Creates the database indexes and reports missing or unused ones"""
+    report = StormDB.shared().ensure_indexes()
+    for collection, status in report.items():
+        print(f"{collection}: " + ", ".join(f"{len(v)} {k}" for k, v in status.items()))
+
+@task
+def backfill_album_release_dates(c):
+    """ Normalizes release dates for albums stored without one"""
+    StormDB.shared().backfill_album_release_dates()
 
-    extract_missing_album_tracks(c)
+@task
+def run_full_etl(c, max_workers=4, stale_days=30):
+    """ Runs the full ETL job, independent operations run concurrently
+
+    An interrupted run resumes from its checkpoints when run again.
+    """
+
+    context = StormContext(storm_client(), StormDB.shared())
+    start_date = datetime.now() - timedelta(days=7)
+    stale_before = datetime.now() - timedelta(days=int(stale_days))
+
+    playlist_ids = ["0R1gw1JbcOFD0r8IzrbtYP", "2zngrEiplX6Z1aAaIWgZ4m"]
+    extract = [
+        ETLPlaylistOperation([playlist_id], incremental=True) for playlist_id in playlist_ids
+    ]
+    artists = [ETLPlaylistArtists([playlist_id]) for playlist_id in playlist_ids]
+    # A single refresh over both playlists, so shared artists are fetched once
+    albums = ETLArtistAlbums(None, start_date, incremental=True, playlist_ids=playlist_ids)
+    enrichment = ETLArtistEnrichment(stale_before)
+    album_tracks = ETLAlbumTracks()
+
+    depends_on = {enrichment: artists, albums: artists, album_tracks: [albums]}
+    for playlist, playlist_artists in zip(extract, artists):
+        depends_on[playlist_artists] = [playlist]
+
+    job = StormJob(
+        *extract, *artists, enrichment, albums, album_tracks,
+        depends_on=depends_on, max_workers=int(max_workers), checkpoint_key="full_etl",
+    )
+    job.execute(context)
 
 @task
 def run_storm_in_range(c, start_date=None, end_date=None):
@@ -84,11 +162,11 @@ def run_storm_in_range(c, start_date=None, end_date=None):
     else:    
         end_date = datetime.strptime(end_date, "%Y-%m-%d")
 
-    context = StormContext(StormClient(), StormDB(), StormUserClient(os.getenv("SPOTIFY_USER_ID")))
+    context = StormContext(storm_client(), StormDB.shared(), storm_user_client(os.getenv("SPOTIFY_USER_ID")))
     artists = context.storm_db.get_playlist_artists("0R1gw1JbcOFD0r8IzrbtYP") + context.storm_db.get_playlist_artists("2zngrEiplX6Z1aAaIWgZ4m")
     tracks = ArtistTrackBuilder(artists, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")).execute(context)
 
-    context.storm_user_client.add_tracks_to_playlist_by_name(f"Storm Weekly {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}", [track["_id"] for track in tracks], make_new=True, overwrite=True)
+    context.storm_user_client.add_tracks_to_playlist_by_name(f"Storm Weekly {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}", [track["_id"] for track in tracks], make_new=True, sync=True)
 
 @task
 def run_many_storms_weekly(c, start_date=None, end_date=datetime.now()):
@@ -1 +1,183 @@
-from storm.jobs.base import *
\ No newline at end of file
+from storm.jobs.base import *
+from storm.jobs.base import StormJobError
+
+import threading
+import time
+from datetime import timedelta
+import pytest
+
+
+class RecordingOperation(StormOperation):
+    """Records when it ran, optionally sleeping or failing."""
+
+    def __init__(self, name, log, duration=0, error=None):
+        self.name = name
+        self.log = log
+        self.duration = duration
+        self.error = error
+
+    def execute(self, context):
+        self.log.append(("start", self.name))
+        time.sleep(self.duration)
+        self.log.append(("end", self.name))
+        if self.error:
+            raise self.error
+        return self.name
+
+
+class BarrierOperation(StormOperation):
+    """Only completes if another operation is running at the same time."""
+
+    def __init__(self, barrier):
+        self.barrier = barrier
+
+    def execute(self, context):
+        self.barrier.wait(timeout=5)
+        return True
+
+
+def test_storm_job_runs_dependencies_first():
+    log = []
+    a, b, c = (RecordingOperation(name, log) for name in "abc")
+    job = StormJob(c, b, a, depends_on={c: [b], b: [a]}, max_workers=4)
+
+    results = job.execute(None)
+
+    assert [name for event, name in log if event == "start"] == ["a", "b", "c"]
+    assert results == {a: "a", b: "b", c: "c"}
+
+
+def test_storm_job_runs_independent_operations_concurrently():
+    barrier = threading.Barrier(2)
+    job = StormJob(BarrierOperation(barrier), BarrierOperation(barrier), max_workers=2)
+
+    assert all(job.execute(None).values())
+
+
+def test_storm_job_fail_fast_raises_first_error():
+    log = []
+    failing = RecordingOperation("failing", log, error=RuntimeError("boom"))
+    dependent = RecordingOperation("dependent", log)
+    job = StormJob(failing, dependent, depends_on={dependent: [failing]})
+
+    with pytest.raises(RuntimeError, match="boom"):
+        job.execute(None)
+
+    assert ("start", "dependent") not in log
+
+
+def test_storm_job_continue_on_error_skips_dependents():
+    log = []
+    failing = RecordingOperation("failing", log, error=RuntimeError("boom"))
+    dependent = RecordingOperation("dependent", log)
+    transitive = RecordingOperation("transitive", log)
+    independent = RecordingOperation("independent", log)
+    job = StormJob(
+        failing, dependent, transitive, independent,
+        depends_on={dependent: [failing], transitive: [dependent]},
+        max_workers=2, fail_fast=False,
+    )
+
+    with pytest.raises(StormJobError) as error:
+        job.execute(None)
+
+    assert list(error.value.errors) == [failing]
+    assert error.value.skipped == [dependent, transitive]
+    assert ("end", "independent") in log
+
+
+def test_storm_job_rejects_invalid_dependencies():
+    log = []
+    a, b = RecordingOperation("a", log), RecordingOperation("b", log)
+
+    with pytest.raises(ValueError):
+        StormJob(a, b, depends_on={a: [b], b: [a]})
+
+    with pytest.raises(ValueError):
+        StormJob(a, depends_on={a: [b]})
+
+
+class CheckpointDB:
+    """Keeps checkpoints in memory with the StormDB checkpoint methods."""
+
+    def __init__(self):
+        self.checkpoints = {}
+
+    def get_checkpoint(self, key):
+        return self.checkpoints.get(key)
+
+    def save_checkpoint(self, key, completed=False, **progress):
+        self.checkpoints.setdefault(key, {}).update(progress, completed=completed)
+
+    def clear_checkpoint(self, key):
+        self.checkpoints.pop(key, None)
+
+
+def test_storm_job_resumes_after_completed_operations():
+    log = []
+    context = StormContext(None, CheckpointDB())
+    first = RecordingOperation("first", log)
+    second = RecordingOperation("second", log, error=RuntimeError("boom"))
+    job = StormJob(first, second, depends_on={second: [first]}, checkpoint_key="job")
+
+    with pytest.raises(RuntimeError):
+        job.execute(context)
+    assert sorted(context.storm_db.checkpoints) == ["job", "job:0:RecordingOperation"]
+    assert first.is_completed(context)
+
+    # The rerun skips the completed operation and clears checkpoints on success
+    second.error = None
+    log.clear()
+    job.execute(context)
+    assert [name for event, name in log if event == "start"] == ["second"]
+    assert context.storm_db.checkpoints == {}
+
+
+def test_storm_job_starts_over_after_stale_run():
+    log = []
+    context = StormContext(None, CheckpointDB())
+    first = RecordingOperation("first", log)
+    second = RecordingOperation("second", log, error=RuntimeError("boom"))
+    job = StormJob(
+        first, second, depends_on={second: [first]}, checkpoint_key="job",
+        resume_within=timedelta(hours=1),
+    )
+
+    with pytest.raises(RuntimeError):
+        job.execute(context)
+
+    # A run started after resume_within clears the completed markers of the earlier run
+    context.storm_db.checkpoints["job"]["started"] -= timedelta(hours=2)
+    second.error = None
+    log.clear()
+    job.execute(context)
+    assert [name for event, name in log if event == "start"] == ["first", "second"]
+    assert context.storm_db.checkpoints == {}
+
+
+def test_storm_job_without_checkpoint_key_keeps_no_markers():
+    log = []
+    context = StormContext(None, CheckpointDB())
+    operation = RecordingOperation("operation", log)
+    operation.checkpoint_key = "operation"
+
+    StormJob(operation).execute(context)
+    StormJob(operation).execute(context)
+    assert [name for event, name in log if event == "start"] == ["operation", "operation"]
+    assert context.storm_db.checkpoints == {}
+
+
+def test_storm_operation_checkpoints():
+    context = StormContext(None, CheckpointDB())
+    operation = StormOperation()
+    assert operation.load_checkpoint(context) == {}
+
+    operation.checkpoint_key = "operation"
+    operation.save_checkpoint(context, cursor="album_1")
+    assert operation.load_checkpoint(context)["cursor"] == "album_1"
+
+    # A completed checkpoint is cleared so the operation starts over
+    operation.complete_checkpoint(context)
+    assert operation.is_completed(context)
+    assert operation.load_checkpoint(context) == {}
+    assert context.storm_db.checkpoints == {}
@@ -1,8 +1,10 @@
-from storm.jobs.etl import ETLPlaylistOperation
+from storm.jobs.etl import ETLPlaylistOperation, ETLArtistAlbums, ETLAlbumTracks
 from storm.jobs.base import StormContext
 from storm import StormClient, StormDB
+from storm.objects import Album, Artist
 
 import pytest
+import time
 
 # Define MongoDB test database settings
 TEST_HOST = 'localhost'
@@ -24,4 +26,221 @@ def storm_context():
 def test_etl_playlist_operation(storm_context):
     test_playlists = ["1Jhuw695S6WhcQIJNEVWdc", "2N9YXYN64MhO0Pz5jok6WM"]
 
-    ETLPlaylistOperation(test_playlists).execute(storm_context)
\ No newline at end of file
+    ETLPlaylistOperation(test_playlists).execute(storm_context)
+
+class StubPlaylistClient:
+    """Serves a fixed playlist and counts track fetches."""
+
+    def __init__(self, snapshot_id, track_ids):
+        self.snapshot_id = snapshot_id
+        self.track_ids = track_ids
+        self.track_fetches = 0
+
+    def get_playlist_metadata(self, playlist_id):
+        return {"id": playlist_id, "name": "test_playlist", "snapshot_id": self.snapshot_id}
+
+    def get_playlist_tracks(self, playlist_id):
+        self.track_fetches += 1
+        return [
+            {
+                "added_at": "2024-01-01T00:00:00Z",
+                "added_by": {"id": "test_user"},
+                "is_local": False,
+                "track": {
+                    "id": track_id,
+                    "name": track_id,
+                    "artists": [{"id": "test_artist_id", "name": "test_artist"}],
+                    "album": {"id": "test_album_id"},
+                },
+            }
+            for track_id in self.track_ids
+        ]
+
+
+def test_etl_playlist_operation_incremental():
+    storm_db = StormDB(host=TEST_HOST, port=TEST_PORT, db_name=TEST_DB_NAME)
+    operation = ETLPlaylistOperation(["test_playlist_id"], incremental=True)
+
+    client = StubPlaylistClient("snapshot_1", ["track_a", "track_b"])
+    operation.execute(StormContext(client, storm_db))
+    assert storm_db.get_playlist_track_ids("test_playlist_id") == {
+        "track_atest_playlist_id", "track_btest_playlist_id"
+    }
+
+    # Unchanged snapshot skips the track fetch entirely
+    operation.execute(StormContext(client, storm_db))
+    assert client.track_fetches == 1
+
+    # Changed snapshot applies only the difference
+    client = StubPlaylistClient("snapshot_2", ["track_b", "track_c"])
+    operation.execute(StormContext(client, storm_db))
+    assert storm_db.get_playlist_track_ids("test_playlist_id") == {
+        "track_btest_playlist_id", "track_ctest_playlist_id"
+    }
+
+    storm_db.client.drop_database(TEST_DB_NAME)
+
+
+class StubArtistAlbumClient:
+    """Returns one album per artist, recording which artists were fetched."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.fetched = []
+
+    def get_artist_albums(self, artist_id):
+        self.fetched.append(artist_id)
+        time.sleep(self.delay)
+        if artist_id == "failing_artist":
+            raise Exception("Service unavailable")
+        return [{"id": f"{artist_id}_album", "name": "album", "artists": [{"id": artist_id}]}]
+
+
+def test_etl_artist_albums_concurrent():
+    storm_db = StormDB(host=TEST_HOST, port=TEST_PORT, db_name=TEST_DB_NAME)
+    for i in range(10):
+        Artist(_id=f"artist_{i}", name=f"artist {i}").save()
+
+    Artist(_id="failing_artist", name="failing artist").save()
+
+    # A failed fetch is logged and the other artists are still written
+    client = StubArtistAlbumClient()
+    artists = [f"artist_{i}" for i in range(0, 10, 2)] + ["unknown_artist", "failing_artist"]
+    ETLArtistAlbums(artists, None, max_workers=4).execute(StormContext(client, storm_db))
+
+    assert sorted(client.fetched) == [f"artist_{i}" for i in range(0, 10, 2)] + ["failing_artist"]
+    assert storm_db.get_artist_album_ids("failing_artist") == set()
+    for artist_id in [f"artist_{i}" for i in range(0, 10, 2)]:
+        assert storm_db.get_artist_album_ids(artist_id) == {f"{artist_id}_album"}
+
+    storm_db.client.drop_database(TEST_DB_NAME)
+
+
+def _playlist_item(track_id, artist_ids):
+    return {
+        "added_at": "2024-01-01T00:00:00Z",
+        "added_by": {"id": "test_user"},
+        "is_local": False,
+        "track": {
+            "id": track_id,
+            "name": "track",
+            "artists": [{"id": artist_id, "name": artist_id} for artist_id in artist_ids],
+            "album": {"id": "test_album_id"},
+        },
+    }
+
+
+def test_etl_artist_albums_playlist_ids_fetches_shared_artists_once():
+    storm_db = StormDB(host=TEST_HOST, port=TEST_PORT, db_name=TEST_DB_NAME)
+    storm_db.update_playlist_tracks("playlist_a", [_playlist_item("track_a", ["shared", "artist_a"])])
+    storm_db.update_playlist_tracks("playlist_b", [_playlist_item("track_b", ["shared"])])
+    for playlist_id in ["playlist_a", "playlist_b"]:
+        storm_db.update_artists_from_playlist_tracks(playlist_id)
+
+    client = StubArtistAlbumClient()
+    operation = ETLArtistAlbums(None, None, playlist_ids=["playlist_a", "playlist_b"])
+    operation.execute(StormContext(client, storm_db))
+
+    assert sorted(client.fetched) == ["artist_a", "shared"]
+
+    storm_db.client.drop_database(TEST_DB_NAME)
+
+class StubAlbumTrackClient:
+    """Returns one track per album, except for failing albums and albums left out as unavailable."""
+
+    def __init__(self, failing, unavailable=()):
+        self.failing = failing
+        self.unavailable = unavailable
+
+    def get_several_album_tracks(self, album_ids):
+        album_ids = [album_id for album_id in album_ids if album_id not in self.unavailable]
+        return {
+            album_id: [] if album_id in self.failing else [
+                {"id": f"{album_id}_track", "name": "track", "artists": [{"id": "artist"}]}
+            ]
+            for album_id in album_ids
+        }
+
+
+def test_etl_album_tracks_pipeline():
+    storm_db = StormDB(host=TEST_HOST, port=TEST_PORT, db_name=TEST_DB_NAME)
+    for i in range(25):
+        Album(_id=f"album_{i:02d}", name="album", artists=[{"id": "artist"}]).save()
+
+    client = StubAlbumTrackClient(failing={"album_03"}, unavailable={"album_07"})
+    operation = ETLAlbumTracks(batch_size=4, workers=3, read_batch_size=10, queue_size=2)
+    operation.execute(StormContext(client, storm_db))
+
+    # The failed album waits out its backoff, the unavailable one is retried next run
+    remaining = storm_db.get_albums_for_track_collection(fields=["_id"])
+    assert [album["_id"] for album in remaining] == ["album_07"]
+    failed = storm_db.db.get_collection('album').find_one({"_id": "album_03"})
+    assert failed["track_collection_fail_count"] == 1
+    assert failed["next_track_collection_attempt"] is not None
+    assert storm_db.db.get_collection('track').count_documents({}) == 23
+
+    # An album left out by a failed request is not charged a failure
+    unavailable = storm_db.db.get_collection('album').find_one({"_id": "album_07"})
+    assert "track_collection_fail_count" not in unavailable
+
+    storm_db.client.drop_database(TEST_DB_NAME)
+
+
+def test_etl_album_tracks_resumes_from_checkpoint():
+    storm_db = StormDB(host=TEST_HOST, port=TEST_PORT, db_name=TEST_DB_NAME)
+    for i in range(10):
+        Album(_id=f"album_{i:02d}", name="album", artists=[{"id": "artist"}]).save()
+
+    # Albums up to the cursor were processed by an interrupted run
+    storm_db.save_checkpoint("album_tracks", cursor="album_05")
+    client = StubAlbumTrackClient(failing=set())
+    operation = ETLAlbumTracks(batch_size=2, workers=2, read_batch_size=4, checkpoint_key="album_tracks")
+    operation.execute(StormContext(client, storm_db))
+
+    remaining = storm_db.get_albums_for_track_collection(fields=["_id"])
+    assert [album["_id"] for album in remaining] == [f"album_{i:02d}" for i in range(6)]
+    assert storm_db.get_checkpoint("album_tracks") is None
+
+    storm_db.client.drop_database(TEST_DB_NAME)
+
+
+def test_etl_artist_albums_resumes_from_checkpoint():
+    storm_db = StormDB(host=TEST_HOST, port=TEST_PORT, db_name=TEST_DB_NAME)
+    artist_ids = [f"artist_{i}" for i in range(6)]
+    for artist_id in artist_ids:
+        Artist(_id=artist_id, name=artist_id).save()
+
+    # Artists up to the cursor were handled by an interrupted run
+    storm_db.save_checkpoint("artist_albums", cursor="artist_2")
+    client = StubArtistAlbumClient()
+    operation = ETLArtistAlbums(artist_ids, None, max_workers=2, checkpoint_key="artist_albums")
+    operation.execute(StormContext(client, storm_db))
+
+    assert sorted(client.fetched) == ["artist_3", "artist_4", "artist_5"]
+    assert storm_db.get_checkpoint("artist_albums") is None
+
+    storm_db.client.drop_database(TEST_DB_NAME)
+
+
+class StubFailingWriteDB:
+    """Returns artists to refresh and fails the first album write."""
+
+    def __init__(self, artist_ids):
+        self.artist_ids = artist_ids
+
+    def get_artists_for_album_collection(self, start_date, **kwargs):
+        return [{"_id": artist_id, "name": artist_id} for artist_id in self.artist_ids]
+
+    def update_albums_from_artist_albums(self, artist, albums, album_totals=None):
+        raise RuntimeError("Write failed")
+
+
+def test_etl_artist_albums_cancels_pending_fetches_on_error():
+    artist_ids = [f"artist_{i}" for i in range(50)]
+    client = StubArtistAlbumClient(delay=0.01)
+    operation = ETLArtistAlbums(artist_ids, None, max_workers=2)
+
+    with pytest.raises(RuntimeError, match="Write failed"):
+        operation.execute(StormContext(client, StubFailingWriteDB(artist_ids)))
+
+    assert len(client.fetched) < len(artist_ids)
@@ -0,0 +1,20 @@
+from storm.objects.album import Album, parse_release_date
+
+from datetime import datetime
+
+def test_parse_release_date():
+    assert parse_release_date("2021-04-09", "day") == datetime(2021, 4, 9)
+    assert parse_release_date("2021-04", "month") == datetime(2021, 4, 1)
+    assert parse_release_date("2021", "year") == datetime(2021, 1, 1)
+
+def test_parse_release_date_infers_precision():
+    assert parse_release_date("2021-04-09") == datetime(2021, 4, 9)
+    assert parse_release_date("2021") == datetime(2021, 1, 1)
+
+def test_parse_release_date_invalid():
+    assert parse_release_date(None) is None
+    assert parse_release_date("0000", "year") is None
+
+def test_album_from_json_release_datetime():
+    album = Album.from_json({"id": "test_id", "name": "test_album", "release_date": "2021-04", "release_date_precision": "month"})
+    assert album.release_datetime == datetime(2021, 4, 1)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from storm.async_client import AsyncStormClient
+from storm.client import StormClient
+from storm.utils.scheduler import RequestScheduler
+
+
+class StubAlbumsHandler(BaseHTTPRequestHandler):
+    """Serves two pages of albums for every artist after a fixed delay."""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.1
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        artist_id = self.path.split("/")[2]
+        offset = int(self.path.split("offset=")[1].split("&")[0]) if "offset=" in self.path else 0
+        body = json.dumps({
+            "items": [{"id": f"{artist_id}_{i}"} for i in range(offset, min(offset + 50, 60))],
+            "offset": offset,
+            "limit": 50,
+            "total": 60,
+            "next": None,
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def async_client(monkeypatch):
+    monkeypatch.setenv("SPOTIPY_CLIENT_ID", "test_client_id")
+    monkeypatch.setenv("SPOTIPY_CLIENT_SECRET", "test_client_secret")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAlbumsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    storm_client = StormClient(max_page_workers=1, scheduler=RequestScheduler(rate=1000, burst=100))
+    storm_client.sp.prefix = f"http://127.0.0.1:{server.server_port}/"
+    storm_client.sp.set_auth("test_token")
+
+    client = AsyncStormClient(storm_client, concurrency=10)
+    yield client
+    client.close()
+    server.shutdown()
+
+def test_async_client_get_artist_albums(async_client):
+    albums = asyncio.run(async_client.get_artist_albums("0" * 22))
+
+    assert [album["id"] for album in albums] == [f"{'0' * 22}_{i}" for i in range(60)]
+
+def test_async_client_fetches_concurrently(async_client):
+    artist_ids = [f"{i:022d}" for i in range(10)]
+
+    start = time.monotonic()
+    albums = asyncio.run(async_client.get_many_artist_albums(artist_ids))
+
+    # Two sequential pages per artist, artists fetched side by side
+    assert time.monotonic() - start < 1.0
+    assert all(len(albums[artist_id]) == 60 for artist_id in artist_ids)
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from storm.async_database import AsyncStormDB
+
+
+class SlowStormDB:
+    """In-process stand-in for StormDB with blocking calls."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.playlists = {}
+
+    def update_playlist(self, playlist):
+        time.sleep(self.delay)
+        self.playlists[playlist["id"]] = playlist
+
+    def get_playlist_snapshot_id(self, playlist_id):
+        time.sleep(self.delay)
+        return self.playlists[playlist_id]["snapshot_id"]
+
+    def get_playlist_tracks(self, playlist_id, **kwargs):
+        return iter([{"_id": "track_a"}, {"_id": "track_b"}])
+
+    def update_albums_from_artist_albums(self, artist, albums, album_totals=None):
+        self.album_totals = album_totals
+
+
+def test_async_storm_db_round_trip():
+    async def run():
+        async with AsyncStormDB(SlowStormDB(delay=0)) as storm_db:
+            await storm_db.update_playlist({"id": "test_playlist_id", "snapshot_id": "snapshot"})
+            snapshot_id = await storm_db.get_playlist_snapshot_id("test_playlist_id")
+            tracks = await storm_db.get_playlist_tracks("test_playlist_id", fields=["_id"])
+        return snapshot_id, tracks
+
+    snapshot_id, tracks = asyncio.run(run())
+    assert snapshot_id == "snapshot"
+    assert tracks == [{"_id": "track_a"}, {"_id": "track_b"}]
+
+
+def test_async_storm_db_overlaps_calls():
+    async def run():
+        async with AsyncStormDB(SlowStormDB(delay=0.2), max_workers=4) as storm_db:
+            await asyncio.gather(
+                *(storm_db.update_playlist({"id": str(i), "snapshot_id": "s"}) for i in range(4)),
+                asyncio.sleep(0.2),
+            )
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert time.monotonic() - start < 0.6
+
+
+def test_async_storm_db_passes_album_totals():
+    stub_db = SlowStormDB(delay=0)
+
+    async def run():
+        async with AsyncStormDB(stub_db) as storm_db:
+            await storm_db.update_albums_from_artist_albums(
+                {"_id": "test_artist_id"}, [], {"album,single": 3}
+            )
+
+    asyncio.run(run())
+    assert stub_db.album_totals == {"album,single": 3}
@@ -1,4 +1,12 @@
-from storm.client import StormClient
+import json
+import time
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from storm.client import StormClient, StormSpotify, StormUserClient
+from storm.utils.cache import ResponseCache
+from storm.utils.scheduler import RequestScheduler
 
 def test_get_playlist_tracks():
     # Initialize the StormClient
@@ -30,4 +38,361 @@ def test_get_playlist_metadata():
     assert playlist['description'] == 'Testing Storm ETLs'
     assert 'followers' in playlist
     assert 'snapshot_id' in playlist
-    assert 'type' in playlist
\ No newline at end of file
+    assert 'type' in playlist
+
+class FakeAlbumSpotify:
+    """Serves albums with a fixed number of tracks and records endpoint calls."""
+
+    def __init__(self, track_counts):
+        self.track_counts = track_counts
+        self.calls = []
+
+    def _tracks_page(self, album_id, offset, limit):
+        total = self.track_counts[album_id]
+        return {
+            "items": [{"id": f"{album_id}_{i}"} for i in range(offset, min(offset + limit, total))],
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "next": None,
+        }
+
+    def albums(self, album_ids):
+        self.calls.append(("albums", len(album_ids)))
+        return {
+            "albums": [
+                {"id": album_id, "tracks": self._tracks_page(album_id, 0, 50)}
+                if album_id in self.track_counts else None
+                for album_id in album_ids
+            ]
+        }
+
+    def album_tracks(self, album_id, limit=50, offset=0):
+        self.calls.append(("album_tracks", album_id))
+        return self._tracks_page(album_id, offset, limit)
+
+    def next(self, page):
+        return None
+
+
+def _fake_client(monkeypatch, fake_sp):
+    monkeypatch.setenv("SPOTIPY_CLIENT_ID", "test_client_id")
+    monkeypatch.setenv("SPOTIPY_CLIENT_SECRET", "test_client_secret")
+    storm_client = StormClient()
+    storm_client.sp = fake_sp
+    return storm_client
+
+def test_get_several_album_tracks(monkeypatch):
+    track_counts = {f"album_{i}": 10 for i in range(25)}
+    track_counts["album_0"] = 120
+    fake_sp = FakeAlbumSpotify(track_counts)
+    storm_client = _fake_client(monkeypatch, fake_sp)
+
+    album_tracks = storm_client.get_several_album_tracks(list(track_counts) + ["missing_album"])
+
+    assert len(album_tracks["album_0"]) == 120
+    assert all(len(album_tracks[f"album_{i}"]) == 10 for i in range(1, 25))
+    assert album_tracks["missing_album"] == []
+
+    # Two several albums calls, plus pagination only for the long album
+    assert [call for call in fake_sp.calls if call[0] == "albums"] == [("albums", 20), ("albums", 6)]
+    assert [call for call in fake_sp.calls if call[0] == "album_tracks"] == [
+        ("album_tracks", "album_0"), ("album_tracks", "album_0")
+    ]
+
+
+class FailingAlbumSpotify(FakeAlbumSpotify):
+    """Fails every several albums request containing a failing album."""
+
+    def __init__(self, track_counts, failing):
+        super().__init__(track_counts)
+        self.failing = failing
+
+    def albums(self, album_ids):
+        if self.failing in album_ids:
+            raise Exception("Too many requests")
+        return super().albums(album_ids)
+
+def test_get_several_album_tracks_leaves_out_failed_batches(monkeypatch):
+    track_counts = {f"album_{i}": 10 for i in range(25)}
+    storm_client = _fake_client(monkeypatch, FailingAlbumSpotify(track_counts, "album_0"))
+
+    album_tracks = storm_client.get_several_album_tracks(list(track_counts) + ["missing_album"])
+
+    # The failed first batch is left out, the missing album is reported empty
+    assert sorted(album_tracks) == sorted([f"album_{i}" for i in range(20, 25)] + ["missing_album"])
+    assert album_tracks["missing_album"] == []
+
+
+class FakeArtistSpotify:
+    """Serves known artists, fails every batch containing a failing ID."""
+
+    def __init__(self, known, failing=()):
+        self.known = known
+        self.failing = failing
+
+    def artists(self, artist_ids):
+        if any(artist_id in self.failing for artist_id in artist_ids):
+            raise Exception("Service unavailable")
+        return {
+            "artists": [
+                {"id": artist_id} if artist_id in self.known else None for artist_id in artist_ids
+            ]
+        }
+
+def test_get_several_artists_missing(monkeypatch):
+    known = {f"artist_{i}" for i in range(60)}
+    storm_client = _fake_client(monkeypatch, FakeArtistSpotify(known, failing={"artist_55"}))
+
+    artists, missing = storm_client.get_several_artists(sorted(known) + ["removed_artist"])
+
+    # The failed second batch is neither returned nor reported missing
+    assert len(artists) == 50
+    assert missing == []
+
+    storm_client.sp = FakeArtistSpotify(known)
+    artists, missing = storm_client.get_several_artists(["artist_1", "removed_artist"])
+    assert [artist["id"] for artist in artists] == ["artist_1"]
+    assert missing == ["removed_artist"]
+
+
+class StubSpotifyHandler(BaseHTTPRequestHandler):
+    """Serves a versioned album and answers conditional requests with 304."""
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = json.dumps({"id": self.path.split("/")[-1]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubSpotifyHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSpotifyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+def test_response_cache_revalidation(stub_server, tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", ttls={"albums": 0.05})
+    sp = StormSpotify(scheduler=RequestScheduler(), cache=cache, auth="test_token")
+    sp.prefix = stub_server
+
+    assert sp.album("4aawyAB9vmqN3uQ7FjRGTy") == {"id": "4aawyAB9vmqN3uQ7FjRGTy"}
+    assert sp.album("4aawyAB9vmqN3uQ7FjRGTy") == {"id": "4aawyAB9vmqN3uQ7FjRGTy"}
+    assert len(StubSpotifyHandler.requests) == 1
+
+    time.sleep(0.1)
+    assert sp.album("4aawyAB9vmqN3uQ7FjRGTy") == {"id": "4aawyAB9vmqN3uQ7FjRGTy"}
+    assert StubSpotifyHandler.requests[-1] == ("/albums/4aawyAB9vmqN3uQ7FjRGTy", '"v1"')
+    assert cache.stats()["revalidations"] == 1
+
+
+class FakeUserSpotify:
+    """Serves pages of the user's playlists and records calls."""
+
+    def __init__(self, playlist_count):
+        self.playlists = [{"id": f"playlist_{i}", "name": f"Playlist {i}"} for i in range(playlist_count)]
+        self.calls = []
+
+    def current_user_playlists(self, limit=50, offset=0):
+        self.calls.append(("current_user_playlists", offset))
+        return self._page(offset, limit)
+
+    def _page(self, offset, limit):
+        return {
+            "items": self.playlists[offset:offset + limit],
+            "offset": offset,
+            "limit": limit,
+            "next": offset + limit if offset + limit < len(self.playlists) else None,
+        }
+
+    def next(self, page):
+        self.calls.append(("next", page["next"]))
+        return self._page(page["next"], page["limit"])
+
+    def user_playlist_create(self, user_id, name):
+        playlist = {"id": f"playlist_{len(self.playlists)}", "name": name}
+        self.playlists.append(playlist)
+        return playlist
+
+
+def _fake_user_client(monkeypatch, fake_sp, **kwargs):
+    monkeypatch.setenv("SPOTIPY_CLIENT_ID", "test_client_id")
+    monkeypatch.setenv("SPOTIPY_CLIENT_SECRET", "test_client_secret")
+    user_client = StormUserClient("test_user", **kwargs)
+    user_client.sp = fake_sp
+    return user_client
+
+def test_get_playlist_id_by_name_all_pages(monkeypatch):
+    fake_sp = FakeUserSpotify(120)
+    user_client = _fake_user_client(monkeypatch, fake_sp)
+
+    assert user_client.get_playlist_id_by_name("Playlist 110") == "playlist_110"
+    assert user_client.get_playlist_id_by_name("Playlist 5") == "playlist_5"
+    assert user_client.get_playlist_id_by_name("Missing") is None
+
+    # The index is built once from three pages
+    assert len(fake_sp.calls) == 3
+
+def test_playlist_index_tracks_created_playlists(monkeypatch):
+    fake_sp = FakeUserSpotify(2)
+    user_client = _fake_user_client(monkeypatch, fake_sp)
+    user_client.get_playlist_index()
+
+    playlist_id = user_client.create_playlist("Storm Weekly")
+
+    assert user_client.get_playlist_id_by_name("Storm Weekly") == playlist_id
+    assert len(fake_sp.calls) == 1
+
+def test_playlist_index_ttl(monkeypatch):
+    fake_sp = FakeUserSpotify(2)
+    user_client = _fake_user_client(monkeypatch, fake_sp, playlist_index_ttl=0)
+
+    user_client.get_playlist_id_by_name("Playlist 0")
+    user_client.get_playlist_id_by_name("Playlist 0")
+
+    assert len(fake_sp.calls) == 2
+
+
+class FakePlaylistSpotify:
+    """Holds one playlist's track IDs and records write calls."""
+
+    def __init__(self, track_ids):
+        self.track_ids = list(track_ids)
+        self.snapshot = 0
+        self.writes = []
+
+    def playlist(self, playlist_id, fields=None):
+        return {"snapshot_id": f"snapshot_{self.snapshot}"}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, additional_types=None):
+        items = [{"track": {"id": track_id}} for track_id in self.track_ids[offset:offset + limit]]
+        next_offset = offset + limit if offset + limit < len(self.track_ids) else None
+        return {"items": items, "next": next_offset, "limit": limit}
+
+    def next(self, page):
+        return self.playlist_items(None, limit=page["limit"], offset=page["next"])
+
+    def playlist_remove_all_occurrences_of_items(self, playlist_id, items, snapshot_id=None):
+        assert snapshot_id == f"snapshot_{self.snapshot}"
+        self.writes.append(("remove", len(items)))
+        self.track_ids = [track_id for track_id in self.track_ids if track_id not in items]
+        self.snapshot += 1
+        return {"snapshot_id": f"snapshot_{self.snapshot}"}
+
+    def playlist_add_items(self, playlist_id, items):
+        self.writes.append(("add", len(items)))
+        self.track_ids.extend(items)
+        self.snapshot += 1
+        return {"snapshot_id": f"snapshot_{self.snapshot}"}
+
+def test_sync_playlist_tracks(monkeypatch):
+    fake_sp = FakePlaylistSpotify([f"track_{i}" for i in range(250)])
+    user_client = _fake_user_client(monkeypatch, fake_sp)
+
+    target = [f"track_{i}" for i in range(5, 255)]
+    user_client.add_tracks_to_playlist("test_playlist_id", target, sync=True)
+
+    assert sorted(fake_sp.track_ids) == sorted(target)
+    assert fake_sp.writes == [("remove", 5), ("add", 5)]
+
+def test_sync_playlist_tracks_unchanged(monkeypatch):
+    fake_sp = FakePlaylistSpotify(["track_a", "track_b"])
+    user_client = _fake_user_client(monkeypatch, fake_sp)
+
+    assert user_client.sync_playlist_tracks("test_playlist_id", ["track_b", "track_a", "track_a"]) == (0, 0)
+    assert fake_sp.writes == []
+
+def test_get_playlist_tracks_field_profile(monkeypatch):
+    class FakePlaylistTracksSpotify:
+        def __init__(self):
+            self.fields = []
+
+        def playlist_tracks(self, playlist_id, fields=None, limit=100, offset=0):
+            self.fields.append(fields)
+            return {
+                "items": [{"track": {"id": "test_track_id", "available_markets": ["US"]}}],
+                "total": 1,
+                "limit": limit,
+                "offset": offset,
+                "next": None,
+            }
+
+        def next(self, page):
+            return None
+
+    fake_sp = FakePlaylistTracksSpotify()
+    storm_client = _fake_client(monkeypatch, fake_sp)
+
+    assert storm_client.get_playlist_tracks("test_playlist_id") == [{"track": {"id": "test_track_id"}}]
+    assert fake_sp.fields[0].startswith("items(added_at")
+
+
+class FakeDiscographySpotify:
+    """Serves an artist's albums then singles, as Spotify groups them, and records pages fetched."""
+
+    def __init__(self, albums, singles):
+        self.items = albums + singles
+        self.pages = []
+
+    def artist_albums(self, artist_id, include_groups=None, limit=50, offset=0):
+        self.pages.append((include_groups, offset))
+        return {
+            "items": [{"id": album_id} for album_id in self.items[offset:offset + limit]],
+            "total": len(self.items),
+            "limit": limit,
+            "offset": offset,
+            "next": "next" if offset + limit < len(self.items) else None,
+        }
+
+def test_get_new_artist_albums_unchanged(monkeypatch):
+    albums = [f"album_{i}" for i in range(120)]
+    fake_sp = FakeDiscographySpotify(albums, [])
+    storm_client = _fake_client(monkeypatch, fake_sp)
+
+    new_albums, totals = storm_client.get_new_artist_albums(
+        "test_artist_id", set(albums), {"album,single": 120}
+    )
+
+    assert new_albums == []
+    assert totals == {"album,single": 120}
+    assert fake_sp.pages == [("album,single", 0)]
+
+def test_get_new_artist_albums_stops_at_total_growth(monkeypatch):
+    albums = [f"album_{i}" for i in range(120)]
+    singles = [f"single_{i}" for i in range(10)]
+    # The new single is listed after every album, on the third page
+    fake_sp = FakeDiscographySpotify(albums, ["new_single"] + singles + ["filler"] * 30)
+    storm_client = _fake_client(monkeypatch, fake_sp)
+
+    new_albums, totals = storm_client.get_new_artist_albums(
+        "test_artist_id", set(albums + singles + ["filler"]), {"album,single": 160}
+    )
+
+    assert [album["id"] for album in new_albums] == ["new_single"]
+    assert totals == {"album,single": 161}
+    assert fake_sp.pages == [("album,single", 0), ("album,single", 50), ("album,single", 100)]
+
+def test_get_new_artist_albums_first_refresh(monkeypatch):
+    fake_sp = FakeDiscographySpotify([f"album_{i}" for i in range(60)], [])
+    storm_client = _fake_client(monkeypatch, fake_sp)
+
+    new_albums, totals = storm_client.get_new_artist_albums("test_artist_id", {"album_0"})
+
+    assert len(new_albums) == 59
+    assert totals == {"album,single": 60}
@@ -1,8 +1,10 @@
 import pytest
+from datetime import datetime, timedelta
 from pymongo import MongoClient
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
 from storm.database import StormDB
-from storm.objects.storm_config import StormConfig
+from storm.objects import StormConfig, Album, Artist, Track
 
 # Define MongoDB test database settings
 TEST_HOST = 'localhost'
@@ -83,3 +85,262 @@ def test_update_playlist(storm_db):
 
     # Verify that the document was inserted into the test MongoDB collection
     assert storm_db.db.get_collection('playlist').count_documents({}) == 1
+
+def _playlist_item(track_id):
+    return {
+        "added_at": "2024-01-01T00:00:00Z",
+        "added_by": {"id": "test_user"},
+        "is_local": False,
+        "track": {
+            "id": track_id,
+            "name": f"track {track_id}",
+            "artists": [{"id": "test_artist_id", "name": "test_artist"}],
+            "album": {"id": "test_album_id"},
+        },
+    }
+
+def test_update_playlist_tracks_bulk(storm_db):
+    tracks = [_playlist_item(f"track_{i}") for i in range(5)]
+    storm_db.update_playlist_tracks("test_playlist_id", tracks, bulk=True, batch_size=2)
+
+    assert storm_db.db.get_collection('playlist_track').count_documents({}) == 5
+    assert storm_db.db.get_collection('track').count_documents({}) == 5
+
+    # Re-sync without the first track, which should be soft deleted
+    storm_db.update_playlist_tracks("test_playlist_id", tracks[1:], flag_deleted=True, bulk=True)
+
+    playlist_tracks = storm_db.db.get_collection('playlist_track')
+    assert playlist_tracks.count_documents({"sys_is_deleted": True}) == 1
+    assert playlist_tracks.find_one({"_id": "track_0test_playlist_id"})["sys_is_deleted"]
+
+def test_get_artist_albums_and_tracks(storm_db):
+    Album(_id="album_1", name="album 1", artists=[{"id": "artist_1"}, {"id": "artist_2"}]).save()
+    Album(_id="album_2", name="album 2", artists=[{"id": "artist_2"}]).save()
+    Track(_id="track_1", name="track 1", artists=[{"id": "artist_1"}], album={"id": "album_1"}).save()
+
+    assert [album._id for album in storm_db.get_artist_albums("artist_1")] == ["album_1"]
+    assert len(storm_db.get_artist_albums("artist_2")) == 2
+    assert [track._id for track in storm_db.get_artist_tracks("artist_1")] == ["track_1"]
+
+def test_update_artists_from_playlist_tracks(storm_db):
+    tracks = [_playlist_item(f"track_{i}") for i in range(3)]
+    tracks[0]["track"]["artists"].append({"id": "other_artist_id", "name": "other_artist"})
+    storm_db.update_playlist_tracks("test_playlist_id", tracks, bulk=True)
+
+    storm_db.update_artists_from_playlist_tracks("test_playlist_id", batch_size=1)
+    storm_db.update_artists_from_tracks()
+
+    artists = storm_db.db.get_collection('artist')
+    assert artists.count_documents({}) == 2
+    assert artists.find_one({"_id": "other_artist_id"})["name"] == "other_artist"
+
+def test_get_artists_tracks_by_date(storm_db):
+    Album.from_json({"id": "album_1", "name": "album 1", "artists": [{"id": "artist_1"}], "release_date": "2024-01-03", "release_date_precision": "day"}).save()
+    Album.from_json({"id": "album_2", "name": "album 2", "artists": [{"id": "artist_2"}], "release_date": "2024", "release_date_precision": "year"}).save()
+    Album.from_json({"id": "album_3", "name": "album 3", "artists": [{"id": "artist_1"}], "release_date": "2023-06-01", "release_date_precision": "day"}).save()
+    for album_id in ["album_1", "album_2", "album_3"]:
+        Track(_id=f"{album_id}_track", name="track", artists=[{"id": "artist_1"}], album={"id": album_id}).save()
+
+    tracks = storm_db.get_artists_tracks_by_date(["artist_1", "artist_2"], "2024-01-01", "2024-01-07")
+
+    assert sorted(track["_id"] for track in tracks) == ["album_1_track", "album_2_track"]
+
+def test_backfill_album_release_dates(storm_db):
+    albums = storm_db.db.get_collection('album')
+    albums.insert_one({"_id": "album_1", "name": "album 1", "release_date": "2021-04", "release_date_precision": "month"})
+
+    assert storm_db.backfill_album_release_dates() == 1
+    assert albums.find_one({"_id": "album_1"})["release_datetime"] == datetime(2021, 4, 1)
+    assert storm_db.backfill_album_release_dates() == 0
+
+def test_ensure_indexes(storm_db):
+    report = storm_db.ensure_indexes()
+
+    assert all(not status["missing"] for status in report.values())
+    assert "playlist_id_1_sys_is_deleted_1" in storm_db.db.get_collection('playlist_track').index_information()
+    assert "artists.id_1_release_datetime_1" in storm_db.db.get_collection('album').index_information()
+
+def test_get_playlist_tracks_projected(storm_db):
+    tracks = [_playlist_item(f"track_{i}") for i in range(3)]
+    storm_db.update_playlist_tracks("test_playlist_id", tracks, bulk=True)
+    storm_db.soft_delete_playlist_tracks("test_playlist_id", ids=["track_0test_playlist_id"])
+
+    playlist_tracks = list(storm_db.get_playlist_tracks("test_playlist_id", fields=["track_id"]))
+
+    assert sorted(playlist_tracks, key=lambda x: x["_id"]) == [
+        {"_id": "track_1test_playlist_id", "track_id": "track_1"},
+        {"_id": "track_2test_playlist_id", "track_id": "track_2"},
+    ]
+    assert len(storm_db.get_playlist_tracks("test_playlist_id", include_deleted=True)) == 3
+    assert storm_db.get_playlist_artists("test_playlist_id") == ["test_artist_id"]
+
+def test_update_artists_metadata(storm_db):
+    storm_db.update_playlist_tracks("test_playlist_id", [_playlist_item("track_0")], bulk=True)
+    storm_db.update_artists_from_playlist_tracks("test_playlist_id")
+
+    artists = list(storm_db.get_artists_for_enrichment(fields=["_id"]))
+    assert artists == [{"_id": "test_artist_id"}]
+
+    storm_db.update_artists_metadata([
+        {"id": "test_artist_id", "name": "test_artist", "genres": ["ambient"], "popularity": 50, "followers": {"total": 10}}
+    ])
+
+    assert len(storm_db.get_artists_for_enrichment()) == 0
+    assert storm_db.db.get_collection('artist').find_one({"_id": "test_artist_id"})["genres"] == ["ambient"]
+    assert len(storm_db.get_artists_for_enrichment(stale_before=datetime.now())) == 1
+
+def test_update_artists_metadata_missing(storm_db):
+    Artist(_id="test_artist_id", name="test_artist").save()
+
+    assert storm_db.update_artists_metadata_missing(["test_artist_id"]) == 1
+
+    # Missing artists are only requested again once stale
+    assert len(storm_db.get_artists_for_enrichment()) == 0
+    assert storm_db.db.get_collection('artist').find_one({"_id": "test_artist_id"})["metadata_missing"]
+    assert len(storm_db.get_artists_for_enrichment(stale_before=datetime.now())) == 1
+
+def test_update_albums_from_artist_albums(storm_db):
+    Artist(_id="test_artist_id", name="test_artist").save()
+    artist = {"_id": "test_artist_id"}
+    albums = [{"id": f"album_{i}", "name": f"album {i}", "artists": [{"id": "test_artist_id"}]} for i in range(3)]
+
+    storm_db.update_albums_from_artist_albums(artist, albums[:2])
+    storm_db.update_albums_from_artist_albums(artist, albums, album_totals={"album": 3})
+
+    assert storm_db.get_artist_album_ids("test_artist_id") == {"album_0", "album_1", "album_2"}
+    stored_artist = storm_db.db.get_collection('artist').find_one({"_id": "test_artist_id"})
+    assert stored_artist["album_totals"] == {"album": 3}
+    assert stored_artist["last_album_update"] is not None
+
+def test_get_artists_for_album_collection_artist_ids(storm_db):
+    Artist(_id="artist_missing", name="missing").save()
+    Artist(_id="artist_stale", name="stale", last_album_update=datetime(2020, 1, 1)).save()
+    Artist(_id="artist_fresh", name="fresh", last_album_update=datetime(2030, 1, 1)).save()
+
+    artists = storm_db.get_artists_for_album_collection(datetime(2025, 1, 1), fields=["_id"])
+    assert {artist["_id"] for artist in artists} == {"artist_missing", "artist_stale"}
+
+    artists = storm_db.get_artists_for_album_collection(
+        datetime(2025, 1, 1), fields=["_id"], artist_ids=["artist_stale", "artist_fresh"]
+    )
+    assert [artist["_id"] for artist in artists] == ["artist_stale"]
+
+def test_get_albums_for_track_collection_pages_by_id(storm_db):
+    for i in range(5):
+        Album(_id=f"album_{i}", name=f"album {i}", artists=[{"id": "test_artist_id"}]).save()
+
+    first = storm_db.get_albums_for_track_collection(fields=["_id"], limit=3)
+    assert [album["_id"] for album in first] == ["album_0", "album_1", "album_2"]
+
+    rest = storm_db.get_albums_for_track_collection(fields=["_id"], after_id="album_2", limit=3)
+    assert [album["_id"] for album in rest] == ["album_3", "album_4"]
+
+def test_update_tracks_from_several_album_tracks(storm_db):
+    for album_id in ["album_a", "album_b"]:
+        Album(_id=album_id, name=album_id, artists=[{"id": "test_artist_id"}]).save()
+    tracks = [{"id": f"track_{i}", "name": "track", "artists": [{"id": "test_artist_id"}]} for i in range(3)]
+
+    collected, failed = storm_db.update_tracks_from_several_album_tracks(
+        {"album_a": tracks, "album_b": []}
+    )
+
+    assert (collected, failed) == (["album_a"], ["album_b"])
+    assert storm_db.db.get_collection('track').count_documents({"album.id": "album_a"}) == 3
+    albums = {album["_id"]: album for album in storm_db.db.get_collection('album').find()}
+    assert albums["album_a"]["tracks_collected_date"] is not None
+    assert "tracks_collected_date" not in albums["album_b"]
+    assert albums["album_b"]["track_collection_fail_count"] == 1
+    assert albums["album_b"]["next_track_collection_attempt"] > datetime.now()
+
+    # A later successful collection clears the backoff
+    storm_db.update_tracks_from_several_album_tracks({"album_b": tracks})
+    album = storm_db.db.get_collection('album').find_one({"_id": "album_b"})
+    assert "track_collection_fail_count" not in album
+    assert "next_track_collection_attempt" not in album
+
+def test_update_tracks_from_album_tracks_clears_backoff(storm_db):
+    Album(_id="test_album_id", name="test_album", artists=[{"id": "test_artist_id"}]).save()
+    storm_db.update_album_track_collection_fail("test_album_id")
+
+    tracks = [{"id": "track_0", "name": "track", "artists": [{"id": "test_artist_id"}]}]
+    storm_db.update_tracks_from_album_tracks("test_album_id", tracks)
+
+    album = storm_db.db.get_collection('album').find_one({"_id": "test_album_id"})
+    assert album["tracks_collected_date"] is not None
+    assert "track_collection_fail_count" not in album
+    assert "next_track_collection_attempt" not in album
+
+def test_checkpoints(storm_db):
+    storm_db.save_checkpoint("job:albums", operation="ETLAlbumTracks", cursor="album_1")
+    storm_db.save_checkpoint("job:artists", cursor="artist_a")
+    storm_db.save_checkpoint("job:artists", cursor="artist_b")
+    storm_db.save_checkpoint("other", completed=True)
+
+    assert storm_db.get_checkpoint("job:albums")["cursor"] == "album_1"
+    assert storm_db.get_checkpoint("job:artists")["cursor"] == "artist_b"
+    assert storm_db.get_checkpoint("job:albums")["operation"] == "ETLAlbumTracks"
+    assert storm_db.get_checkpoint("other")["completed"] is True
+    assert storm_db.get_checkpoint("missing") is None
+    assert len(storm_db.get_checkpoints()) == 3
+
+    assert storm_db.clear_checkpoints("job:") == 2
+    storm_db.clear_checkpoint("other")
+    assert storm_db.get_checkpoints() == []
+
+def test_update_album_track_collection_fail_backoff(storm_db):
+    Album(_id="test_album_id", name="test_album", artists=[{"id": "test_artist_id"}]).save()
+    base_delay = timedelta(hours=1)
+
+    storm_db.update_album_track_collection_fail("test_album_id", base_delay, max_attempts=3)
+    storm_db.update_album_track_collection_fail("test_album_id", base_delay, max_attempts=3)
+    album = storm_db.db.get_collection('album').find_one({"_id": "test_album_id"})
+    assert album["track_collection_fail_count"] == 2
+    delay = album["next_track_collection_attempt"] - datetime.now()
+    assert timedelta(hours=1, minutes=59) < delay <= timedelta(hours=2)
+
+    # Waiting out the backoff makes the album eligible again
+    assert list(storm_db.get_albums_for_track_collection(fields=["_id"], max_attempts=3)) == []
+    storm_db.db.get_collection('album').update_one(
+        {"_id": "test_album_id"}, {"$set": {"next_track_collection_attempt": datetime(2020, 1, 1)}}
+    )
+    assert len(list(storm_db.get_albums_for_track_collection(fields=["_id"], max_attempts=3))) == 1
+
+    storm_db.update_album_track_collection_fail("test_album_id", base_delay, max_attempts=3)
+    assert list(storm_db.get_albums_for_track_collection(fields=["_id"], max_attempts=3)) == []
+    assert [album["_id"] for album in storm_db.get_quarantined_albums(3, fields=["_id"])] == ["test_album_id"]
+
+def test_soft_delete_playlist_tracks_ids_and_exclude_ids(storm_db):
+    tracks = [_playlist_item(f"track_{i}") for i in range(3)]
+    storm_db.update_playlist_tracks("test_playlist_id", tracks, bulk=True)
+
+    deleted = storm_db.soft_delete_playlist_tracks(
+        "test_playlist_id",
+        ids=["track_0test_playlist_id", "track_1test_playlist_id"],
+        exclude_ids=["track_1test_playlist_id"],
+    )
+
+    assert deleted == 1
+    assert storm_db.get_playlist_track_ids("test_playlist_id") == {
+        "track_1test_playlist_id", "track_2test_playlist_id"
+    }
+
+def _raise_write_errors(codes):
+    def insert_many(documents, ordered=True):
+        raise BulkWriteError({
+            "nInserted": len(documents) - len(codes),
+            "writeErrors": [{"index": i, "code": code, "errmsg": "error"} for i, code in enumerate(codes)],
+        })
+    return insert_many
+
+def test_insert_new_documents_write_errors(storm_db, monkeypatch):
+    artists = [{"id": f"artist_{i}", "name": f"artist {i}"} for i in range(3)]
+    collection = Artist._get_collection()
+
+    # Duplicates from a concurrent run are ignored
+    monkeypatch.setattr(collection, "insert_many", _raise_write_errors([11000]))
+    assert storm_db._insert_new_documents(Artist, artists) == 2
+
+    # Any other write error is raised
+    monkeypatch.setattr(collection, "insert_many", _raise_write_errors([11000, 2]))
+    with pytest.raises(BulkWriteError):
+        storm_db._insert_new_documents(Artist, artists)
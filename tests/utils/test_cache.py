@@ -0,0 +1,49 @@
+import time
+
+from storm.utils.cache import ResponseCache
+
+def test_cache_hit_and_miss(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    key = cache.key("albums/test_album_id", {"market": None})
+
+    assert cache.get(key) is None
+    cache.set(key, "albums", {"id": "test_album_id"})
+
+    assert cache.get(key) == ({"id": "test_album_id"}, None, True)
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_cache_key_ignores_parameter_order(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    assert cache.key("albums", {"ids": "a", "market": "US"}) == cache.key("albums", {"market": "US", "ids": "a"})
+
+def test_cache_expiry_and_revalidation(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", ttls={"albums": 0.05, "artists": 0.05})
+    cache.set("with_etag", "albums", {"id": "a"}, etag='"v1"')
+    cache.set("without_etag", "artists", {"id": "b"})
+    time.sleep(0.1)
+
+    # Stale responses are only kept if they can be revalidated
+    assert cache.get("with_etag") == ({"id": "a"}, '"v1"', False)
+    assert cache.get("without_etag") is None
+
+    cache.refresh("with_etag", "albums")
+    assert cache.get("with_etag")[2]
+    assert cache.stats()["revalidations"] == 1
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=100)
+    cache.set("first", "albums", "x" * 40)
+    cache.set("second", "albums", "x" * 40)
+    cache.get("first")
+    cache.set("third", "albums", "x" * 40)
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.size() <= 100
+
+def test_cache_persists_on_disk(tmp_path):
+    ResponseCache(tmp_path / "cache.sqlite").set("key", "albums", {"id": "a"})
+    assert ResponseCache(tmp_path / "cache.sqlite").get("key")[0] == {"id": "a"}
@@ -0,0 +1,19 @@
+from storm.utils.fields import FIELD_PROFILES, strip_fields
+
+def test_strip_fields_nested():
+    track = {
+        "id": "test_track_id",
+        "available_markets": ["US"],
+        "album": {"id": "test_album_id", "images": [{"url": "x"}], "available_markets": ["US"]},
+        "artists": [{"id": "test_artist_id", "external_urls": {"spotify": "x"}}],
+    }
+
+    assert strip_fields([track], FIELD_PROFILES["storm"]["drop"]) == [{
+        "id": "test_track_id",
+        "album": {"id": "test_album_id"},
+        "artists": [{"id": "test_artist_id"}],
+    }]
+
+def test_strip_fields_full_profile():
+    track = {"id": "test_track_id", "available_markets": ["US"]}
+    assert strip_fields(track, FIELD_PROFILES["full"]["drop"]) is track
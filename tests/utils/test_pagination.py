@@ -0,0 +1,46 @@
+import threading
+import time
+
+from storm.utils.pagination import fetch_all_pages
+
+def _page(offset, limit, total):
+    return {
+        "items": list(range(offset, min(offset + limit, total))),
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "next": "next" if offset + limit < total else None,
+    }
+
+def test_fetch_all_pages_in_order():
+    def fetch_page(offset, limit):
+        # Later pages return first to check that order is preserved
+        time.sleep(0.01 * (10 - offset // limit))
+        return _page(offset, limit, 95)
+
+    items = fetch_all_pages(_page(0, 10, 95), fetch_page, max_workers=4)
+    assert items == list(range(95))
+
+def test_fetch_all_pages_bounds_concurrency():
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def fetch_page(offset, limit):
+        with lock:
+            in_flight.append(offset)
+            peak.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(offset)
+        return _page(offset, limit, 200)
+
+    fetch_all_pages(_page(0, 10, 200), fetch_page, max_workers=3)
+    assert max(peak) <= 3
+
+def test_fetch_all_pages_single_page():
+    assert fetch_all_pages(_page(0, 10, 5), None) == list(range(5))
+
+def test_fetch_all_pages_without_total():
+    pages = [{"items": [1], "next": "a"}, {"items": [2], "next": "b"}, {"items": [3], "next": None}]
+    assert fetch_all_pages(pages[0], None, next_page=lambda page: pages[pages.index(page) + 1]) == [1, 2, 3]
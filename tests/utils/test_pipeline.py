@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from storm.utils.pipeline import run_pipeline, CompletionCursor
+
+def test_run_pipeline_processes_every_item():
+    written = []
+    count = run_pipeline(range(100), lambda item: item * 2, lambda item, result: written.append(result))
+
+    assert count == 100
+    assert sorted(written) == [item * 2 for item in range(100)]
+
+def test_run_pipeline_overlaps_fetches():
+    barrier = threading.Barrier(4)
+
+    def process(item):
+        # Only completes if four items are processed at the same time
+        barrier.wait(timeout=5)
+        return item
+
+    assert run_pipeline(range(8), process, lambda item, result: None, workers=4) == 8
+
+def test_run_pipeline_bounds_read_ahead():
+    read = []
+    written = []
+
+    def source():
+        for item in range(50):
+            read.append(item)
+            yield item
+
+    def sink(item, result):
+        # The reader may only run a bounded distance ahead of a slow sink
+        assert len(read) - len(written) <= 2 * 2 + 2 + 2
+        time.sleep(0.005)
+        written.append(item)
+
+    run_pipeline(source(), lambda item: item, sink, workers=2, queue_size=2)
+    assert len(written) == 50
+
+@pytest.mark.parametrize("stage", ["source", "process", "sink"])
+def test_run_pipeline_raises_stage_errors(stage):
+    def source():
+        for item in range(20):
+            if stage == "source" and item == 5:
+                raise RuntimeError("boom")
+            yield item
+
+    def process(item):
+        if stage == "process" and item == 5:
+            raise RuntimeError("boom")
+        return item
+
+    def sink(item, result):
+        if stage == "sink" and item == 5:
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_pipeline(source(), process, sink, workers=2, queue_size=2)
+
+def test_completion_cursor_advances_in_order():
+    cursor = CompletionCursor()
+    for item_id in ["a", "b", "c"]:
+        cursor.issue(item_id)
+
+    assert cursor.complete("b") is None
+    assert cursor.complete("a") == "b"
+    assert cursor.complete("c") == "c"
@@ -0,0 +1,22 @@
+from storm.utils.pool_stats import PoolStatsListener
+
+def test_pool_stats_counts_checkouts():
+    listener = PoolStatsListener()
+
+    listener.connection_check_out_started(None)
+    listener.connection_checked_out(None)
+    listener.connection_check_out_started(None)
+    listener.connection_check_out_failed(None)
+
+    stats = listener.stats()
+    assert stats["checkouts"] == 1
+    assert stats["checkout_failures"] == 1
+    assert stats["total_wait_seconds"] >= 0
+    assert stats["max_wait_seconds"] == stats["total_wait_seconds"]
+
+def test_pool_stats_reset():
+    listener = PoolStatsListener()
+    listener.connection_created(None)
+    listener.reset()
+
+    assert listener.stats()["connections_created"] == 0
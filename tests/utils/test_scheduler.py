@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from storm.client import endpoint_name
+from storm.utils.scheduler import RequestScheduler
+
+
+class ThrottledError(Exception):
+    def __init__(self, status=429, retry_after="0"):
+        self.http_status = status
+        self.headers = {"Retry-After": retry_after}
+
+
+def test_scheduler_retries_throttled_requests():
+    scheduler = RequestScheduler(rate=100, burst=10, base_backoff=0.01)
+    responses = [ThrottledError(), ThrottledError(), "ok"]
+
+    def request():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert scheduler.call("albums", request) == "ok"
+
+    stats = scheduler.stats()
+    assert stats["requests"] == 3
+    assert stats["throttle_events"] == 2
+    assert stats["endpoint_throttle_events"] == {"albums": 2}
+
+def test_scheduler_follows_retry_after():
+    scheduler = RequestScheduler(rate=100, burst=10, base_backoff=0)
+    responses = [ThrottledError(retry_after="0.2"), "ok"]
+
+    def request():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    start = time.monotonic()
+    scheduler.call("albums", request)
+    assert time.monotonic() - start >= 0.2
+
+def test_scheduler_raises_after_max_retries():
+    scheduler = RequestScheduler(rate=100, burst=10, max_retries=2, base_backoff=0)
+
+    def request():
+        raise ThrottledError()
+
+    with pytest.raises(ThrottledError):
+        scheduler.call("albums", request)
+    assert scheduler.stats()["failures"] == 1
+
+def test_scheduler_does_not_retry_other_errors():
+    scheduler = RequestScheduler()
+
+    def request():
+        raise ThrottledError(status=404)
+
+    with pytest.raises(ThrottledError):
+        scheduler.call("albums", request)
+    assert scheduler.stats()["requests"] == 1
+
+def test_scheduler_paces_requests():
+    scheduler = RequestScheduler(rate=50, burst=1)
+
+    start = time.monotonic()
+    for _ in range(6):
+        scheduler.call("albums", lambda: None)
+
+    assert time.monotonic() - start >= 0.09
+    assert scheduler.stats()["queue_wait_seconds"] > 0
+
+def test_endpoint_name():
+    assert endpoint_name("playlists/abc123/tracks?offset=100") == "playlists/tracks"
+    assert endpoint_name("albums/?ids=a,b") == "albums"
+    assert endpoint_name("users/test_user/playlists") == "users/playlists"
+    assert endpoint_name("me/playlists") == "me/playlists"